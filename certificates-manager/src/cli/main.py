@@ -1,11 +1,15 @@
-from ..utils.command_runner import run_command, check_tool_version
-from ..utils.user_input import get_user_choice, get_password_with_confirmation
-from ..generators.key_generator import generate_key, parse_curves
-from ..generators.cert_generator import generate_ca_certificate, generate_signed_certificate
+from ..utils.command_runner import control_service
+from ..utils.user_input import get_user_choice, get_store_passwords
+from ..generators.key_generator import list_curves_cached, prewarm_keys
+from ..generators.cert_generator import generate_ca_certificate, generate_signed_certificates_batch
 from ..generators.store_generator import generate_pkcs12_file, create_server_keystore, create_truststore
 from ..utils.thingsboard_device import ThingsboardDeviceManager
+from ..utils.performance_tester import PerformanceTest
+from ..utils.file_utils import list_subdirectories, find_missing_files, read_files, remove_tree
+from concurrent.futures import ThreadPoolExecutor
+import ctypes
+import logging
 import os
-import shutil
 import sys
 
 THINGSBOARD_CONF_PATH = "C:\\Program Files\\Thingsboard\\thingsboard\\conf\\certs\\test"
@@ -13,12 +17,9 @@ THINGSBOARD_CONF_PATH = "C:\\Program Files\\Thingsboard\\thingsboard\\conf\\cert
 def generate_certificates():
     """Handle the certificate generation workflow"""
     print("\n=== Certificate Generation ===")
-    
-    if not check_tool_version("openssl"): return
-    if not check_tool_version("keytool"): return
 
     alg_options = ["EC", "RSA"]
-    alg_choice = get_user_choice("\nChoose certificate generation algorithm:", alg_options)
+    alg_choice = get_user_choice("\nChoose certificate generation algorithm (EC recommended - much faster key generation than RSA):", alg_options)
     if not alg_choice: return
     print(f"Algorithm chosen: {alg_choice}")
 
@@ -27,17 +28,12 @@ def generate_certificates():
 
     if alg_choice == 'EC':
         print("\n--- Fetching Elliptic Curves ---")
-        curves_stdout, curves_stderr = run_command(['ecparam', '-list_curves'], tool_name="openssl")
-        if curves_stderr:
-            print(f"Error fetching curves: {curves_stderr}")
-            return
-        
-        available_curves = parse_curves(curves_stdout)
+        available_curves = list_curves_cached()
         if not available_curves:
             print("No elliptic curves found or output could not be parsed.")
             return
         
-        curve_choice = get_user_choice("Choose an elliptic curve:", available_curves)
+        curve_choice = get_user_choice("Choose an elliptic curve (prime256v1 recommended):", available_curves)
         if not curve_choice: return
         print(f"Curve chosen: {curve_choice}")
 
@@ -56,7 +52,7 @@ def generate_certificates():
             overwrite = input(f"Directory '{output_dir_name}' already exists. Overwrite? (yes/no): ").lower()
             if overwrite == 'yes':
                 try:
-                    shutil.rmtree(output_dir_name)
+                    remove_tree(output_dir_name)
                     print(f"Removed existing directory: {output_dir_name}")
                 except Exception as e:
                     print(f"Error removing existing directory '{output_dir_name}': {e}")
@@ -83,7 +79,6 @@ def generate_certificates():
     # Filenames (used consistently)
     ca_key_fn = "ca.key"
     ca_cert_fn = "ca.crt"
-    ca_srl_fn = "ca.srl"
     server_key_fn = "server.key"
     server_cert_fn = "server.crt"
     device_key_fn = "device1.key" # Assuming one device for now
@@ -94,16 +89,24 @@ def generate_certificates():
     truststore_fn = "server_truststore.jks"
 
 
-    if not generate_ca_certificate(alg_choice, curve_choice, rsa_bits_choice, output_dir_name, ca_subj):
-        print("\nFailed to generate Root CA certificate. Aborting.")
+    # Generate all three keys in parallel before any certificate is issued
+    if not prewarm_keys(alg_choice, curve_choice, rsa_bits_choice, output_dir_name):
+        print("\nFailed to generate private keys. Aborting.")
         return
 
-    if not generate_signed_certificate("server", ca_key_fn, ca_cert_fn, ca_srl_fn, alg_choice, curve_choice, rsa_bits_choice, output_dir_name, server_subj):
-        print("\nFailed to generate Server certificate. Aborting.")
+    ca = generate_ca_certificate(alg_choice, curve_choice, rsa_bits_choice, output_dir_name, ca_subj, use_existing_key=True)
+    if not ca:
+        print("\nFailed to generate Root CA certificate. Aborting.")
         return
-        
-    if not generate_signed_certificate("device1", ca_key_fn, ca_cert_fn, ca_srl_fn, alg_choice, curve_choice, rsa_bits_choice, output_dir_name, device_subj):
-        print("\nFailed to generate Device certificate. Aborting.") # Corrected message
+
+    # Server and device certificates only depend on the CA, so sign them concurrently.
+    results = generate_signed_certificates_batch(
+        [("server", server_subj), ("device1", device_subj)],
+        ca, alg_choice, curve_choice, rsa_bits_choice, output_dir_name, use_existing_key=True
+    )
+    failed = [entity_name for entity_name, succeeded in results.items() if not succeeded]
+    if failed:
+        print(f"\nFailed to generate certificate(s) for: {', '.join(failed)}. Aborting.")
         return
 
     # --- PKCS12 and JKS Generation ---
@@ -112,44 +115,43 @@ def generate_certificates():
     p12_password = None
     keystore_password = None
     truststore_password = None
+    generated = {"p12": False, "keystore": False, "truststore": False}
 
     if generate_pkcs12_and_jks == "yes":
         print("\n--- PKCS12 and JKS Password Setup ---")
         print("Using default password 'changeit' for all keystores")
         
         # Use default "changeit" password for all stores
-        p12_password = "changeit"
-        keystore_password = "changeit"
-        truststore_password = "changeit"
+        p12_password, keystore_password, truststore_password = get_store_passwords(default_password="changeit")
 
         # Generate PKCS12
-        if not generate_pkcs12_file(server_cert_fn, server_key_fn, ca_cert_fn, server_p12_fn, "server", p12_password, output_dir_name):
+        generated["p12"] = generate_pkcs12_file(server_cert_fn, server_key_fn, ca_cert_fn, server_p12_fn, "server", p12_password, output_dir_name)
+        if not generated["p12"]:
             print("\nFailed to generate PKCS12 file. Skipping JKS generation.")
         else:
             # Create Server Keystore from PKCS12
-            if not create_server_keystore(server_p12_fn, server_keystore_fn, p12_password, keystore_password, "server", output_dir_name):
+            generated["keystore"] = create_server_keystore(server_p12_fn, server_keystore_fn, p12_password, keystore_password, "server", output_dir_name)
+            if not generated["keystore"]:
                 print("\nFailed to create server keystore JKS.")
             
             # Create Truststore with CA certificate
-            if not create_truststore(ca_cert_fn, truststore_fn, truststore_password, "root-ca", output_dir_name):
+            generated["truststore"] = create_truststore(ca_cert_fn, truststore_fn, truststore_password, "root-ca", output_dir_name)
+            if not generated["truststore"]:
                 print("\nFailed to create truststore JKS.")
 
 
     print(f"\n--- All Operations Complete ---")
     print(f"All files saved in directory: {os.path.abspath(output_dir_name)}")
-    print("  Root CA: ca.key, ca.crt")
-    if os.path.exists(os.path.join(output_dir_name, ca_srl_fn)):
-        print(f"  CA Serial file: {ca_srl_fn}")
+    print(f"  Root CA: {ca_key_fn}, {ca_cert_fn}")
     print(f"  Server: {server_key_fn}, {server_cert_fn}")
     print(f"  Device: {device_key_fn}, {device_cert_fn}")
 
-    if generate_pkcs12_and_jks == "yes":
-        if os.path.exists(os.path.join(output_dir_name, server_p12_fn)):
-            print(f"  Server PKCS12: {server_p12_fn}")
-        if os.path.exists(os.path.join(output_dir_name, server_keystore_fn)):
-            print(f"  Server Keystore JKS: {server_keystore_fn}")
-        if os.path.exists(os.path.join(output_dir_name, truststore_fn)):
-            print(f"  Server Truststore JKS: {truststore_fn}")
+    if generated["p12"]:
+        print(f"  Server PKCS12: {server_p12_fn}")
+    if generated["keystore"]:
+        print(f"  Server Keystore JKS: {server_keystore_fn}")
+    if generated["truststore"]:
+        print(f"  Server Truststore JKS: {truststore_fn}")
 
 
 def apply_certificates():
@@ -158,7 +160,6 @@ def apply_certificates():
     
     try:
         # Check if we have admin rights
-        import ctypes
         if not ctypes.windll.shell32.IsUserAnAdmin():
             print("Error: This operation requires administrator privileges.")
             print("Please run the application as administrator.")
@@ -166,7 +167,7 @@ def apply_certificates():
 
         # 1. Select the certificates directory
         print("\nLooking for certificate directories...")
-        cert_dirs = [d for d in os.listdir('.') if os.path.isdir(d)]
+        cert_dirs = list_subdirectories('.')
         if not cert_dirs:
             print("No certificate directories found in current location.")
             return
@@ -179,17 +180,19 @@ def apply_certificates():
         keystore_path = os.path.join(cert_dir, "server_keystore.jks")
         truststore_path = os.path.join(cert_dir, "server_truststore.jks")
         
-        if not os.path.exists(keystore_path) or not os.path.exists(truststore_path):
+        if find_missing_files(cert_dir, ["server_keystore.jks", "server_truststore.jks"]):
             print("Error: Required JKS files not found in selected directory.")
             print(f"Looking for:\n  {keystore_path}\n  {truststore_path}")
             return
 
-        # 2. Stop ThingsBoard service
+        # 2. Stop ThingsBoard service, reading the source files while it shuts down
+        copy_targets = {keystore_path: "server_keystore.jks", truststore_path: "server_truststore.jks"}
         print("\nStopping ThingsBoard service...")
-        stop_result = os.system('net stop thingsboard')
-        if stop_result != 0:
-            print("Failed to stop ThingsBoard service. Is it running?")
-            # Continue anyway as files might be copyable
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            read_future = executor.submit(read_files, copy_targets)
+            if not control_service("stop"):
+                print("Failed to stop ThingsBoard service. Is it running?")
+                # Continue anyway as files might be copyable
 
         # 3. Copy files
         print("\nCopying certificate files...")
@@ -197,9 +200,10 @@ def apply_certificates():
             # Ensure target directory exists
             os.makedirs(THINGSBOARD_CONF_PATH, exist_ok=True)
             
-            # Copy files with overwrite
-            shutil.copy2(keystore_path, os.path.join(THINGSBOARD_CONF_PATH, "server_keystore.jks"))
-            shutil.copy2(truststore_path, os.path.join(THINGSBOARD_CONF_PATH, "server_truststore.jks"))
+            # Write file contents with overwrite; the service does not need the source metadata
+            for source_path, contents in read_future.result().items():
+                with open(os.path.join(THINGSBOARD_CONF_PATH, copy_targets[source_path]), 'wb') as target_file:
+                    target_file.write(contents)
             print("Certificate files copied successfully.")
         except Exception as e:
             print(f"Error copying files: {str(e)}")
@@ -207,8 +211,7 @@ def apply_certificates():
 
         # 4. Start ThingsBoard service
         print("\nStarting ThingsBoard service...")
-        start_result = os.system('net start thingsboard')
-        if start_result != 0:
+        if not control_service("start"):
             print("Failed to start ThingsBoard service.")
             return
 
@@ -224,7 +227,7 @@ def create_thingsboard_device():
     
     # 1. Find certificate directories
     print("\nLooking for certificate directories...")
-    cert_dirs = [d for d in os.listdir('.') if os.path.isdir(d)]
+    cert_dirs = list_subdirectories('.')
     if not cert_dirs:
         print("No certificate directories found in current location.")
         return
@@ -237,7 +240,7 @@ def create_thingsboard_device():
     ca_cert_path = os.path.join(cert_dir, "ca.crt")
     device_cert_path = os.path.join(cert_dir, "device1.crt")
     
-    if not os.path.exists(device_cert_path) or not os.path.exists(ca_cert_path):
+    if find_missing_files(cert_dir, ["ca.crt", "device1.crt"]):
         print("Error: Required certificate files not found in selected directory.")
         print(f"Looking for:\n  {ca_cert_path}\n  {device_cert_path}")
         return
@@ -256,25 +259,12 @@ def create_thingsboard_device():
         tb_manager.create_profile_with_certificate(profile_name, ca_cert_path)
 
         print(f"\n--- Creating Device: {device_name} ---")
-        device_id = tb_manager.create_device_with_profile(
-            device_name=device_name,
-            profile_name=profile_name
-        )
-
+        # The device is created together with its X.509 credentials
+        device_id = tb_manager.create_device_with_certificate(device_name, profile_name, device_cert_path)
         if device_id:
-            print("\n--- Updating Device Credentials ---")
-            device_credentials = tb_manager.get_device_credentials(device_id=device_id)
-            if device_credentials:
-                if tb_manager.post_modify_device_credentials(
-                    credentials=device_credentials,
-                    device_id=device_id,
-                    cert_path=device_cert_path
-                ):
-                    print(f"\nSuccessfully created and configured device '{device_name}'")
-                else:
-                    print("Failed to update device credentials")
-            else:
-                print("Failed to get device credentials")
+            print(f"\nSuccessfully created and configured device '{device_name}'")
+        else:
+            print("Failed to create device with certificate credentials")
     else:
         print("Failed to connect to ThingsBoard. Please ensure the server is running.")
 
@@ -290,8 +280,6 @@ def check_thingsboard_connection():
 
 def run_performance_tests():
     """Handle performance testing"""
-    from ..utils.performance_tester import PerformanceTest
-    
     tester = PerformanceTest()
     if tester.setup_test():
         tester.run_test()
@@ -302,6 +290,8 @@ def cli_main():
     """
     Main CLI function with menu-driven interface.
     """
+    # Generator and tool status goes through logging; show it as plain lines like the rest of the CLI output
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
     print("\n=== Certificate Management Utility ===")
     options = ["GUI", "CLI"]
     choice = get_user_choice("\nSelect interface:", options)
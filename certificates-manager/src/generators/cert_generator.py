@@ -1,100 +1,201 @@
-from ..utils.command_runner import run_command
-from .key_generator import generate_key
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed448, ed25519
+from .key_generator import create_key_file, load_private_key
+from ..utils.file_utils import invalid_filenames, write_file_atomic
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterator
+import datetime
+import functools
+import itertools
+import logging
 import os
 
-def generate_csr(key_filename, csr_filename, subject, output_dir):
-    """Generates a Certificate Signing Request (CSR). Filenames are not paths."""
-    print(f"\n--- Generating CSR: {csr_filename} ---")
-    command = ['req', '-new', '-key', key_filename, '-out', csr_filename, '-subj', subject]
-    
-    stdout, stderr = run_command(command, working_dir=output_dir, tool_name="openssl")
-    if stderr:
-        print(f"Error generating CSR {csr_filename}: {stderr}")
-        return False
-    print(f"Successfully generated CSR: {os.path.join(output_dir, csr_filename)}")
-    return True
+_log = logging.getLogger(__name__)
+
+# Subject components accepted in openssl-style "-subj" strings
+SUBJECT_OIDS = {
+    "CN": NameOID.COMMON_NAME,
+    "O": NameOID.ORGANIZATION_NAME,
+    "OU": NameOID.ORGANIZATIONAL_UNIT_NAME,
+    "C": NameOID.COUNTRY_NAME,
+    "ST": NameOID.STATE_OR_PROVINCE_NAME,
+    "L": NameOID.LOCALITY_NAME,
+    "emailAddress": NameOID.EMAIL_ADDRESS,
+}
+
+@functools.lru_cache(maxsize=32)
+def parse_subject(subject):
+    """Converts an openssl-style subject (e.g. "/CN=My CA/O=Org") into an x509.Name. Cached, as x509.Name is immutable."""
+    if not subject.startswith('/') or '\n' in subject or '\r' in subject:
+        raise ValueError(f"Subject must be a single line starting with '/': {subject!r}")
+    attributes = []
+    for component in subject.strip('/').split('/'):
+        if not component:
+            continue
+        key, sep, value = component.partition('=')
+        if not sep or key not in SUBJECT_OIDS:
+            raise ValueError(f"Unsupported subject component: {component}")
+        attributes.append(x509.NameAttribute(SUBJECT_OIDS[key], value))
+    return x509.Name(attributes)
+
+def signature_hash(private_key):
+    """Returns the digest to sign with; EdDSA keys sign without a separate digest."""
+    if isinstance(private_key, (ed25519.Ed25519PrivateKey, ed448.Ed448PrivateKey)):
+        return None
+    return hashes.SHA256()
+
+def load_certificate(cert_path):
+    """Loads a PEM certificate from disk."""
+    with open(cert_path, 'rb') as cert_file:
+        return x509.load_pem_x509_certificate(cert_file.read())
 
-def generate_ca_certificate(alg_choice, curve_choice, rsa_bits_choice, output_dir, ca_subj, validity_days=1825):
-    """Generates a Root CA key and self-signed certificate with explicit extensions."""
-    print("\n--- Generating Root CA Certificate with Explicit Extensions ---")
+@dataclass
+class CaContext:
+    """Root CA material kept in memory so every signing reuses the parsed key and certificate"""
+    key: Any
+    cert: x509.Certificate
+    serials: Iterator[int]
+
+def create_ca_context(ca_key, ca_cert):
+    """Builds a CaContext whose serial numbers count up from a random starting point."""
+    return CaContext(key=ca_key, cert=ca_cert, serials=itertools.count(x509.random_serial_number()))
+
+@functools.lru_cache(maxsize=8)
+def _load_ca_context(ca_key_path, ca_cert_path, ca_key_mtime_ns, ca_cert_mtime_ns):
+    """Parses the CA files once per (path, mtime) pair; the mtimes are only part of the cache key."""
+    return create_ca_context(load_private_key(ca_key_path), load_certificate(ca_cert_path))
+
+def load_ca_context(output_dir, ca_key_filename="ca.key", ca_cert_filename="ca.crt"):
+    """
+    Loads an existing CA from output_dir. Repeated calls reuse the parsed key, certificate and
+    serial counter until either file is modified.
+    """
+    ca_key_path = os.path.join(output_dir, ca_key_filename)
+    ca_cert_path = os.path.join(output_dir, ca_cert_filename)
+    return _load_ca_context(ca_key_path, ca_cert_path, os.stat(ca_key_path).st_mtime_ns, os.stat(ca_cert_path).st_mtime_ns)
+
+def generate_ca_certificate(alg_choice, curve_choice, rsa_bits_choice, output_dir, ca_subj, validity_days=1825, use_existing_key=False):
+    """
+    Generates a Root CA key and self-signed certificate with explicit extensions.
+    With use_existing_key, the ca.key already written by prewarm_keys is used instead of a new one.
+    Returns the CaContext to sign entity certificates with, or False on failure.
+    """
+    _log.debug("--- Generating Root CA Certificate with Explicit Extensions ---")
     ca_key_filename = "ca.key"
     ca_cert_filename = "ca.crt"
-    
-    # Ensure output_dir exists
-    # This should ideally be handled by the calling function (cli_main.py makes sure it exists)
-    # but a check here doesn't hurt.
-    os.makedirs(output_dir, exist_ok=True)
+    ca_cert_path = os.path.join(output_dir, ca_cert_filename)
 
+    # The calling function (cli_main.py / the GUI) creates and validates output_dir
+    assert os.path.isdir(output_dir), output_dir
 
-    if not generate_key(alg_choice, curve_choice, rsa_bits_choice, ca_key_filename, output_dir):
+    # Reject a malformed subject before spending time on key generation
+    try:
+        ca_name = parse_subject(ca_subj)
+    except ValueError as e:
+        _log.error(f"Error generating CA certificate: {e}")
         return False
 
-    # Extract the CN value from ca_subj for the temporary config.
-    # Assumes ca_subj is in the format "/CN=My CA Name"
-    # A more robust parsing might be needed if ca_subj format varies.
-    cn_value = "Temporary CA Name" # Default
-    if "/CN=" in ca_subj:
-        parts = ca_subj.split('/CN=')
-        if len(parts) > 1:
-            # Further split by '/' if other RDNs are present, e.g. /CN=X/O=Y
-            cn_part = parts[1].split('/')[0]
-            if cn_part:
-                cn_value = cn_part
-        
-        print(f"\n--- Generating self-signed CA certificate: {ca_cert_filename} ---")
-        command = [
-            'req', '-x509', '-new', '-nodes',
-            '-key', ca_key_filename,      # Relative to working_dir (output_dir)
-            '-sha256',
-            '-days', str(validity_days),
-            '-out', ca_cert_filename,     # Relative to working_dir (output_dir)
-            '-subj', ca_subj,             # This provides the subject directly
-        ]
-        
-        stdout, stderr = run_command(command, working_dir=output_dir, tool_name="openssl")
-        
-        if stderr:
-            print(f"Error generating CA certificate: {stderr}")
-            if stdout: # Sometimes OpenSSL req errors go to stdout
-                print(f"STDOUT from failed CA generation: {stdout}")
+    # A freshly generated key is used as-is; only a prewarmed key has to be read back from disk
+    ca_key = None
+    if not use_existing_key:
+        ca_key = create_key_file(alg_choice, curve_choice, rsa_bits_choice, ca_key_filename, output_dir)
+        if ca_key is None:
             return False
-            
-        print(f"Successfully generated CA certificate: {os.path.join(output_dir, ca_cert_filename)}")
-        return True
 
-def generate_signed_certificate(entity_name, ca_key_filename, ca_cert_filename, ca_srl_filename, alg_choice, curve_choice, rsa_bits_choice, output_dir, entity_subj, validity_days=365):
-    """Generates a key, CSR, and a certificate signed by the CA for an entity (server/device). Filenames are not paths."""
-    print(f"\n--- Generating Certificate for {entity_name} ---")
-    entity_key_filename = f"{entity_name}.key"
-    entity_csr_filename = f"{entity_name}.csr"
-    entity_cert_filename = f"{entity_name}.crt"
+    _log.debug(f"--- Generating self-signed CA certificate: {ca_cert_filename} ---")
+    try:
+        if ca_key is None:
+            ca_key = load_private_key(os.path.join(output_dir, ca_key_filename))
+        now = datetime.datetime.now(datetime.timezone.utc)
+        ca_cert = (
+            x509.CertificateBuilder()
+            .subject_name(ca_name)
+            .issuer_name(ca_name)
+            .public_key(ca_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=validity_days))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .add_extension(x509.SubjectKeyIdentifier.from_public_key(ca_key.public_key()), critical=False)
+            .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(ca_key.public_key()), critical=False)
+            .sign(ca_key, signature_hash(ca_key))
+        )
+        write_file_atomic(ca_cert_path, ca_cert.public_bytes(serialization.Encoding.PEM))
+    except Exception as e:
+        _log.error(f"Error generating CA certificate: {e}")
+        return False
 
-    if not generate_key(alg_choice, curve_choice, rsa_bits_choice, entity_key_filename, output_dir):
+    _log.info(f"Successfully generated CA certificate: {ca_cert_path}")
+    return create_ca_context(ca_key, ca_cert)
+
+def generate_signed_certificate(entity_name, ca, alg_choice, curve_choice, rsa_bits_choice, output_dir, entity_subj, validity_days=365, use_existing_key=False):
+    """
+    Generates a key and a certificate signed by the CA context for an entity (server/device).
+    The certificate is built directly from the key and subject, without an intermediate CSR.
+    With use_existing_key, the <entity_name>.key already written by prewarm_keys is used instead of a new one.
+    If ca is None, the CA stored in output_dir is used (see load_ca_context).
+    """
+    _log.debug(f"--- Generating Certificate for {entity_name} ---")
+    bad_filenames = invalid_filenames(entity_name)
+    if bad_filenames:
+        _log.error(f"Expected file names, not paths: {bad_filenames}")
         return False
-    
-    if not generate_csr(entity_key_filename, entity_csr_filename, entity_subj, output_dir):
+    try:
+        entity_name_attrs = parse_subject(entity_subj)
+    except ValueError as e:
+        _log.error(f"Error signing {entity_name} certificate: {e}")
         return False
+    entity_key_filename = f"{entity_name}.key"
+    entity_cert_filename = f"{entity_name}.crt"
+    entity_cert_path = os.path.join(output_dir, entity_cert_filename)
 
-    print(f"\n--- Signing {entity_name} certificate with CA: {entity_cert_filename} ---")
-    command = ['x509', '-req', '-in', entity_csr_filename, '-CA', ca_cert_filename, '-CAkey', ca_key_filename]
-    
-    # Use absolute path for checking srl existence, but relative for command
-    srl_full_path = os.path.join(output_dir, ca_srl_filename)
-    if not os.path.exists(srl_full_path):
-        command.append('-CAcreateserial')
-    command.extend(['-CAserial', ca_srl_filename])
-    
-    command.extend(['-out', entity_cert_filename, '-days', str(validity_days), '-sha256'])
-
-    stdout, stderr = run_command(command, working_dir=output_dir, tool_name="openssl")
-    if stderr:
-        print(f"Error signing {entity_name} certificate: {stderr}")
-        return False
-    print(f"Successfully generated and signed {entity_name} certificate: {os.path.join(output_dir, entity_cert_filename)}")
-    
+    entity_key = None
+    if not use_existing_key:
+        entity_key = create_key_file(alg_choice, curve_choice, rsa_bits_choice, entity_key_filename, output_dir)
+        if entity_key is None:
+            return False
+
+    _log.debug(f"--- Signing {entity_name} certificate with CA: {entity_cert_filename} ---")
     try:
-        os.remove(os.path.join(output_dir, entity_csr_filename))
-        print(f"Cleaned up CSR: {os.path.join(output_dir, entity_csr_filename)}")
-    except OSError as e:
-        print(f"Warning: Could not remove CSR {entity_csr_filename}: {e}")
+        if ca is None:
+            ca = load_ca_context(output_dir)
+        if entity_key is None:
+            entity_key = load_private_key(os.path.join(output_dir, entity_key_filename))
+        public_key = entity_key.public_key()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(entity_name_attrs)
+            .issuer_name(ca.cert.subject)
+            .public_key(public_key)
+            .serial_number(next(ca.serials))
+            .not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=validity_days))
+            .add_extension(x509.SubjectKeyIdentifier.from_public_key(public_key), critical=False)
+            .add_extension(x509.AuthorityKeyIdentifier.from_issuer_public_key(ca.key.public_key()), critical=False)
+            .sign(ca.key, signature_hash(ca.key))
+        )
+        write_file_atomic(entity_cert_path, cert.public_bytes(serialization.Encoding.PEM))
+    except Exception as e:
+        _log.error(f"Error signing {entity_name} certificate: {e}")
+        return False
+    _log.info(f"Successfully generated and signed {entity_name} certificate: {entity_cert_path}")
     return True
+
+def generate_signed_certificates_batch(entities, ca, alg_choice, curve_choice, rsa_bits_choice, output_dir, validity_days=365, use_existing_key=False):
+    """
+    Signs several entity certificates concurrently with the same CA context.
+    entities is a list of (entity_name, entity_subj) pairs. Returns a dict of entity_name -> success.
+    """
+    with ThreadPoolExecutor(max_workers=min(len(entities), os.cpu_count() or 1)) as executor:
+        futures = {
+            entity_name: executor.submit(
+                generate_signed_certificate, entity_name, ca, alg_choice, curve_choice, rsa_bits_choice,
+                output_dir, entity_subj, validity_days, use_existing_key
+            )
+            for entity_name, entity_subj in entities
+        }
+    return {entity_name: future.result() for entity_name, future in futures.items()}
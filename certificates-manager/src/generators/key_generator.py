@@ -1,46 +1,188 @@
-from ..utils.command_runner import run_command
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed448, ed25519, rsa
+from ..utils.command_runner import resolve_tool, run_command
+from ..utils.file_utils import invalid_filenames, write_file_atomic
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import json
+import logging
 import os
 import re
 
-def generate_key(alg_choice, curve_choice, rsa_bits_choice, key_filename, output_dir):
-    """Generates a private key. key_filename is just the name, not path."""
-    print(f"\n--- Generating Private Key: {key_filename} ---")
-    command = ['genpkey', '-algorithm', alg_choice]
-    
+_log = logging.getLogger(__name__)
+
+# Maps the curve names printed by 'openssl ecparam -list_curves' to cryptography curve classes.
+# prime192v1/prime256v1 are OpenSSL's aliases for the NIST P-192/P-256 curves.
+# Newer cryptography releases dropped the binary (SECT*) curves, so only the classes that exist are mapped.
+EC_CURVES = {
+    curve.name: curve
+    for curve in (
+        getattr(ec, class_name, None)
+        for class_name in (
+            "SECP192R1", "SECP224R1", "SECP256K1", "SECP256R1", "SECP384R1", "SECP521R1",
+            "BrainpoolP256R1", "BrainpoolP384R1", "BrainpoolP512R1",
+            "SECT163K1", "SECT163R2", "SECT233K1", "SECT233R1", "SECT283K1",
+            "SECT283R1", "SECT409K1", "SECT409R1", "SECT571K1", "SECT571R1",
+        )
+    )
+    if curve is not None
+}
+EC_CURVES.update({
+    alias: EC_CURVES[name]
+    for alias, name in (("prime192v1", "secp192r1"), ("prime256v1", "secp256r1"))
+    if name in EC_CURVES
+})
+
+# Curves used when the caller has no preference. OpenSSL serves P-256 named-curve keys from its
+# optimized constant-time ecp_nistz256 implementation (AVX2 on x86-64), much faster than the generic
+# ladder used for other curves. Keys are always serialized with the named-curve OID, never explicit parameters.
+DEFAULT_CURVE = 'prime256v1'
+_PREFERRED_CURVES = (DEFAULT_CURVE, 'secp384r1', 'secp521r1')
+
+# One "name : description" entry per line of 'openssl ecparam -list_curves' output
+_CURVE_RE = re.compile(r"^[ \t]*([a-zA-Z0-9_-]+)[ \t]*:[ \t]*(.*?)[ \t\r]*$", re.MULTILINE)
+
+# Parsed output of 'openssl ecparam -list_curves', filled on first use by list_curves_cached
+_available_curves = None
+
+# On-disk copy of the curve list, valid while the openssl binary (path + mtime) is unchanged
+_CURVES_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "certmgr", "curves.json")
+
+def create_private_key(alg_choice, curve_choice=None, rsa_bits_choice=None, fast=False):
+    """
+    Generates a private key object in-process. Raises ValueError for unsupported parameters.
+    fast forces an EC prime256v1 key regardless of the requested algorithm: keygen drops to a few ms,
+    at roughly RSA-3072 strength (128-bit security), which is adequate for test/dev certificates.
+    """
+    if fast:
+        alg_choice, curve_choice = 'EC', _PREFERRED_CURVES[0]
     if alg_choice == 'EC':
-        command.extend(['-pkeyopt', f'ec_paramgen_curve:{curve_choice}'])
-    elif alg_choice == 'RSA':
-        command.extend(['-pkeyopt', f'rsa_keygen_bits:{rsa_bits_choice}'])
-    # Ed25519 and Ed448 don't need additional parameters
-    
-    command.extend(['-out', key_filename])
-    
-    stdout, stderr = run_command(command, working_dir=output_dir, tool_name="openssl")
-    if stderr:
-        print(f"Error generating key {key_filename}: {stderr}")
-        return False
-    print(f"Successfully generated key: {os.path.join(output_dir, key_filename)}")
-    return True
+        if curve_choice in (None, 'auto'):
+            curve_choice = _PREFERRED_CURVES[0]
+        curve = EC_CURVES.get(curve_choice)
+        if curve is None:
+            raise ValueError(f"Elliptic curve '{curve_choice}' is not supported")
+        return ec.generate_private_key(curve())
+    if alg_choice == 'RSA':
+        return rsa.generate_private_key(public_exponent=65537, key_size=int(rsa_bits_choice))
+    if alg_choice == 'Ed25519':
+        return ed25519.Ed25519PrivateKey.generate()
+    if alg_choice == 'Ed448':
+        return ed448.Ed448PrivateKey.generate()
+    raise ValueError(f"Unsupported algorithm '{alg_choice}'")
 
+def load_private_key(key_path):
+    """Loads an unencrypted PEM private key from disk."""
+    with open(key_path, 'rb') as key_file:
+        return serialization.load_pem_private_key(key_file.read(), password=None)
+
+def generate_key(alg_choice, curve_choice, rsa_bits_choice, key_filename, output_dir, fast=False):
+    """Generates a private key. key_filename is just the name, not path."""
+    return create_key_file(alg_choice, curve_choice, rsa_bits_choice, key_filename, output_dir, fast) is not None
+
+def create_key_file(alg_choice, curve_choice, rsa_bits_choice, key_filename, output_dir, fast=False):
+    """Generates a private key, writes it to output_dir and returns the key object (None on failure)."""
+    bad_filenames = invalid_filenames(key_filename)
+    if bad_filenames:
+        _log.error(f"Expected file names, not paths: {bad_filenames}")
+        return None
+    _log.debug(f"--- Generating Private Key: {key_filename} ---")
+    key_path = os.path.join(output_dir, key_filename)
+    try:
+        key = create_private_key(alg_choice, curve_choice, rsa_bits_choice, fast)
+        pem = key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        write_file_atomic(key_path, pem, mode=0o600)
+    except Exception as e:
+        _log.error(f"Error generating key {key_filename}: {e}")
+        return None
+    _log.info(f"Successfully generated key: {key_path}")
+    return key
+
+def prewarm_keys(alg_choice, curve_choice, rsa_bits_choice, output_dir, names=("ca", "server", "device1")):
+    """
+    Generates the private keys for all entities up front. RSA key generation dominates the certificate
+    workflow and holds the GIL, so RSA keys get one worker process each; EC and EdDSA keys take milliseconds
+    and are generated inline, where starting processes would cost more. Returns a dict of name -> key path, or None on failure.
+    """
+    key_filenames = {name: f"{name}.key" for name in names}
+    if alg_choice != 'RSA':
+        if not all(generate_key(alg_choice, curve_choice, rsa_bits_choice, key_filename, output_dir) for key_filename in key_filenames.values()):
+            return None
+    else:
+        # Warned once here, in the parent process, rather than once per key from the workers
+        if int(rsa_bits_choice) > 3072:
+            _log.warning(f"RSA-{rsa_bits_choice} key generation can take several seconds per key ({len(key_filenames)} keys) and is much slower than RSA-3072 or EC with no practical benefit here; consider EC (prime256v1).")
+        with ProcessPoolExecutor(max_workers=min(len(key_filenames), os.cpu_count() or 1)) as executor:
+            futures = [
+                executor.submit(generate_key, alg_choice, curve_choice, rsa_bits_choice, key_filename, output_dir)
+                for key_filename in key_filenames.values()
+            ]
+            if not all(future.result() for future in futures):
+                return None
+    return {name: os.path.join(output_dir, key_filename) for name, key_filename in key_filenames.items()}
+
+@functools.lru_cache(maxsize=4)
 def parse_curves(output):
     """
     Parses the output of 'openssl ecparam -list_curves'.
+    Results are cached per output string, so callers must not modify the returned list.
     """
-    curves = []
     if not output:
-        return curves
-    lines = output.strip().split('\n')
-    for line in lines:
-        line = line.strip()
-        if not line or ':' not in line:
-            continue
-        
-        match = re.match(r"\s*([a-zA-Z0-9_-]+)\s*:(.*)", line)
-        if match:
-            name = match.group(1).strip()
-            description = match.group(2).strip()
-            curves.append({"name": name, "description": description})
-        elif re.match(r"^\s*[a-zA-Z0-9_-]+\s*$", line) and "ECDSA" not in line and "curve" not in line.lower():
-             curves.append({"name": line, "description": "N/A (no description found in output)"})
-    return curves
+        return []
+    return [{"name": match.group(1), "description": match.group(2)} for match in _CURVE_RE.finditer(output)]
 
+def _openssl_fingerprint():
+    """Identifies the openssl binary by path and mtime, or None if it cannot be found."""
+    openssl_path = resolve_tool("openssl")
+    try:
+        return [openssl_path, os.stat(openssl_path).st_mtime]
+    except OSError:
+        return None
+
+def _load_cached_curves(fingerprint):
+    """Returns the cached curve list if it was written for this openssl binary, else None."""
+    if fingerprint is None:
+        return None
+    try:
+        with open(_CURVES_CACHE_PATH, 'r', encoding='utf-8') as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    if cache.get("openssl") != fingerprint:
+        return None
+    return cache.get("curves")
+
+def _save_cached_curves(fingerprint, curves):
+    """Writes the curve list to the on-disk cache; failures only cost the next run a subprocess."""
+    if fingerprint is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(_CURVES_CACHE_PATH), exist_ok=True)
+        write_file_atomic(_CURVES_CACHE_PATH, json.dumps({"openssl": fingerprint, "curves": curves}).encode('utf-8'))
+    except OSError as e:
+        _log.debug(f"Could not write curve cache {_CURVES_CACHE_PATH}: {e}")
+
+def list_curves_cached():
+    """
+    Returns the parsed output of 'openssl ecparam -list_curves', restricted to the curves
+    create_private_key supports (EC_CURVES). The full list is kept in a small JSON cache on disk,
+    so openssl is only run again when its binary changes; the filtered list is kept for the process lifetime.
+    Keys are generated in-process, so without openssl the EC_CURVES names are returned instead.
+    """
+    global _available_curves
+    if _available_curves is None:
+        fingerprint = _openssl_fingerprint()
+        curves = _load_cached_curves(fingerprint)
+        if curves is None:
+            curves_stdout, curves_stderr, returncode = run_command(['ecparam', '-list_curves'], tool_name="openssl")
+            if returncode != 0:
+                _log.warning(f"Could not fetch curve descriptions from openssl: {curves_stderr}")
+                return [{"name": name, "description": f"{curve.key_size}-bit curve"} for name, curve in EC_CURVES.items()]
+            curves = parse_curves(curves_stdout)
+            _save_cached_curves(fingerprint, curves)
+        _available_curves = [curve for curve in curves if curve["name"] in EC_CURVES]
+    return _available_curves
@@ -1,60 +1,95 @@
-from ..utils.command_runner import run_command
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.serialization import pkcs12
+from .key_generator import load_private_key
+from .cert_generator import load_certificate
+from ..utils.file_utils import invalid_filenames, write_file_atomic
+import jks
+import logging
 import os
+import shutil
+
+_log = logging.getLogger(__name__)
 
 def generate_pkcs12_file(server_cert_filename, server_key_filename, ca_cert_filename, p12_filename, p12_alias, p12_password, output_dir):
     """Generates a PKCS12 (.p12) file."""
-    print(f"\n--- Generating PKCS12 File: {p12_filename} ---")
-    command = [
-        'pkcs12', '-export',
-        '-in', server_cert_filename,
-        '-inkey', server_key_filename,
-        '-certfile', ca_cert_filename,
-        '-name', p12_alias,
-        '-out', p12_filename,
-        '-passout', f'pass:{p12_password}' # Pass password directly
-    ]
-    stdout, stderr = run_command(command, working_dir=output_dir, tool_name="openssl")
-    if stderr:
-        print(f"Error generating PKCS12 file {p12_filename}: {stderr}")
+    _log.debug(f"--- Generating PKCS12 File: {p12_filename} ---")
+    bad_filenames = invalid_filenames(server_cert_filename, server_key_filename, ca_cert_filename, p12_filename)
+    if bad_filenames:
+        _log.error(f"Expected file names, not paths: {bad_filenames}")
+        return False
+    p12_path = os.path.join(output_dir, p12_filename)
+    try:
+        key = load_private_key(os.path.join(output_dir, server_key_filename))
+        cert = load_certificate(os.path.join(output_dir, server_cert_filename))
+        ca_cert = load_certificate(os.path.join(output_dir, ca_cert_filename))
+        p12_data = pkcs12.serialize_key_and_certificates(
+            name=p12_alias.encode(),
+            key=key,
+            cert=cert,
+            cas=[ca_cert],
+            encryption_algorithm=serialization.BestAvailableEncryption(p12_password.encode())
+        )
+        write_file_atomic(p12_path, p12_data, mode=0o600)
+    except Exception as e:
+        _log.error(f"Error generating PKCS12 file {p12_filename}: {e}")
         return False
-    print(f"Successfully generated PKCS12 file: {os.path.join(output_dir, p12_filename)}")
+    _log.info(f"Successfully generated PKCS12 file: {p12_path}")
     return True
 
-def create_server_keystore(p12_filename, keystore_filename, p12_password, keystore_password, alias, output_dir):
-    """Creates a JKS server keystore from a PKCS12 file."""
-    print(f"\n--- Creating Server Keystore (JKS): {keystore_filename} ---")
-    command = [
-        '-importkeystore',
-        '-destkeystore', keystore_filename,
-        '-srckeystore', p12_filename,
-        '-srcstoretype', 'PKCS12',
-        '-alias', alias, # This is the alias of the entry within the p12, which becomes the alias in the JKS
-        '-srcstorepass', p12_password,
-        '-deststorepass', keystore_password,
-        '-noprompt' # Suppress interactive prompts
-    ]
-    stdout, stderr = run_command(command, working_dir=output_dir, tool_name="keytool")
-    if stderr:
-        print(f"Error creating server keystore {keystore_filename}: {stderr}")
+def create_server_keystore(p12_filename, keystore_filename, p12_password, keystore_password, alias, output_dir, fast_copy=False):
+    """
+    Creates a JKS server keystore from a PKCS12 file.
+    With fast_copy and matching passwords, the PKCS12 file is linked/copied as the keystore instead,
+    so the result is a PKCS12 keystore (storetype PKCS12, alias taken from the .p12) rather than JKS.
+    """
+    _log.debug(f"--- Creating Server Keystore (JKS): {keystore_filename} ---")
+    bad_filenames = invalid_filenames(p12_filename, keystore_filename)
+    if bad_filenames:
+        _log.error(f"Expected file names, not paths: {bad_filenames}")
         return False
-    print(f"Successfully created server keystore: {os.path.join(output_dir, keystore_filename)}")
+    p12_path = os.path.join(output_dir, p12_filename)
+    keystore_path = os.path.join(output_dir, keystore_filename)
+    try:
+        if fast_copy and p12_password == keystore_password:
+            try:
+                os.link(p12_path, keystore_path)
+            except OSError:
+                shutil.copyfile(p12_path, keystore_path)
+            _log.info(f"Successfully created server keystore (PKCS12): {keystore_path}")
+            return True
+
+        with open(p12_path, 'rb') as p12_file:
+            key, cert, ca_certs = pkcs12.load_key_and_certificates(p12_file.read(), p12_password.encode())
+        key_der = key.private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        # The entry keeps the full chain (server certificate followed by the CA), like keytool -importkeystore
+        chain = [c.public_bytes(serialization.Encoding.DER) for c in [cert, *ca_certs]]
+        entry = jks.PrivateKeyEntry.new(alias, chain, key_der, 'pkcs8')
+        keystore_data = jks.KeyStore.new('jks', [entry]).saves(keystore_password)
+        write_file_atomic(keystore_path, keystore_data, mode=0o600)
+    except Exception as e:
+        _log.error(f"Error creating server keystore {keystore_filename}: {e}")
+        return False
+    _log.info(f"Successfully created server keystore: {keystore_path}")
     return True
 
 def create_truststore(ca_cert_filename, truststore_filename, truststore_password, alias, output_dir):
     """Creates a JKS truststore by importing the CA certificate."""
-    print(f"\n--- Creating Truststore (JKS): {truststore_filename} ---")
-    command = [
-        '-importcert', # Using -importcert explicitly
-        '-trustcacerts',
-        '-alias', alias,
-        '-file', ca_cert_filename,
-        '-keystore', truststore_filename,
-        '-storepass', truststore_password,
-        '-noprompt' # Suppress interactive prompts
-    ]
-    stdout, stderr = run_command(command, working_dir=output_dir, tool_name="keytool")
-    if stderr:
-        print(f"Error creating truststore {truststore_filename}: {stderr}")
+    _log.debug(f"--- Creating Truststore (JKS): {truststore_filename} ---")
+    bad_filenames = invalid_filenames(ca_cert_filename, truststore_filename)
+    if bad_filenames:
+        _log.error(f"Expected file names, not paths: {bad_filenames}")
+        return False
+    truststore_path = os.path.join(output_dir, truststore_filename)
+    try:
+        ca_cert = load_certificate(os.path.join(output_dir, ca_cert_filename))
+        entry = jks.TrustedCertEntry.new(alias, ca_cert.public_bytes(serialization.Encoding.DER))
+        write_file_atomic(truststore_path, jks.KeyStore.new('jks', [entry]).saves(truststore_password))
+    except Exception as e:
+        _log.error(f"Error creating truststore {truststore_filename}: {e}")
         return False
-    print(f"Successfully created truststore: {os.path.join(output_dir, truststore_filename)}")
+    _log.info(f"Successfully created truststore: {truststore_path}")
     return True
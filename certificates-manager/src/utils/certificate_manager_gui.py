@@ -1,20 +1,24 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+from concurrent.futures import ThreadPoolExecutor
+import queue
 import threading
 import time
-from .performance_tester import PerformanceTest
-from .thingsboard_device import ThingsboardDeviceManager
-from ..generators.key_generator import generate_key, parse_curves
-from ..generators.cert_generator import generate_ca_certificate, generate_signed_certificate
+from ..generators.key_generator import DEFAULT_CURVE, list_curves_cached, prewarm_keys
+from ..generators.cert_generator import generate_ca_certificate, generate_signed_certificates_batch
 from ..generators.store_generator import generate_pkcs12_file, create_server_keystore, create_truststore
-from ..utils.command_runner import run_command
-from ..utils.user_input import fuzzy_search
+from ..utils.command_runner import run_command, control_service
+from ..utils.user_input import FuzzySearcher
+from ..utils.file_utils import find_missing_files, read_files, remove_tree
+from .mqtt import MAX_WORKERS
 import os
-import shutil
 import ctypes
 
 THINGSBOARD_CONF_PATH = "C:\\Program Files\\Thingsboard\\thingsboard\\conf\\certs\\test"
 
+# The connection checker only probes the port each cycle; a full HTTP login check runs every this many cycles (~30 s)
+FULL_CHECK_EVERY = 6
+
 SUPPORTED_ALGORITHMS = {
     "RSA": {
         "name": "RSA",
@@ -55,27 +59,88 @@ class CertificateManagerGUI:
         self.root = root
         self.root.title("Certificate Management Utility")
         self.root.geometry("900x700")
+
+        # Admin rights cannot change without a relaunch, so they are checked once
+        try:
+            self._is_admin = bool(ctypes.windll.shell32.IsUserAnAdmin())
+        except AttributeError:
+            self._is_admin = False
         
         # Create notebook for tabs
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(expand=True, fill='both', padx=5, pady=5)
         
-        # Create tabs
-        self.create_certificate_tab()
-        self.create_apply_certificates_tab()
-        self.create_device_tab()
-        self.create_performance_tab()
+        # Create tabs; each tab's widgets are only built the first time it is shown
+        self._tab_builders = {}
+        for title, builder in [
+            ("Generate Certificates", self.create_certificate_tab),
+            ("Apply Certificates", self.create_apply_certificates_tab),
+            ("Device Management", self.create_device_tab),
+            ("Performance Testing", self.create_performance_tab),
+        ]:
+            tab = ttk.Frame(self.notebook)
+            self.notebook.add(tab, text=title)
+            self._tab_builders[str(tab)] = (tab, builder)
+        self._build_tab(self.notebook.select())
+        self.notebook.bind('<<NotebookTabChanged>>', lambda e: self._build_tab(self.notebook.select()))
         
         # Create status bar
         self.create_status_bar()
         
+        # Progress updates from worker threads are queued and applied at most once per 50 ms
+        self._progress_q = queue.Queue()
+        self.root.after(50, self._drain_progress)
+        
+        # One ThingsBoard manager shared by the connection checker and device creation, so the
+        # token obtained by either is reused; the lock keeps them from using it concurrently.
+        # It is created by the first user (see _thingsboard), so requests is not imported at startup
+        self._tb = None
+        self._tb_lock = threading.Lock()
+        
         # Start connection checker
+        self._stop = threading.Event()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.check_connection_thread = threading.Thread(
             target=self.check_connection_periodically, 
             daemon=True
         )
         self.check_connection_thread.start()
 
+    def on_close(self):
+        """Stop the connection checker before destroying the window"""
+        self._stop.set()
+        self.root.destroy()
+
+    def _thingsboard(self):
+        """Returns the shared ThingsBoard manager, creating it on first use; call with self._tb_lock held"""
+        if self._tb is None:
+            from .thingsboard_device import ThingsboardDeviceManager
+            self._tb = ThingsboardDeviceManager()
+        return self._tb
+
+    def _post_progress(self, channel, text, value=None):
+        """Queues a progress update for '<channel>_progress_var' (and '<channel>_progress' if value is given); safe from any thread"""
+        self._progress_q.put((channel, text, value))
+
+    def _apply_queued_progress(self):
+        """Applies only the latest queued update of each channel; must run on the Tk thread"""
+        latest = {}
+        while True:
+            try:
+                channel, text, value = self._progress_q.get_nowait()
+            except queue.Empty:
+                break
+            latest[channel] = (text, value)
+        for channel, (text, value) in latest.items():
+            getattr(self, f"{channel}_progress_var").set(text)
+            if value is not None:
+                getattr(self, f"{channel}_progress")['value'] = value
+
+    def _drain_progress(self):
+        """Periodic Tk callback that coalesces queued progress updates into one redraw"""
+        self._apply_queued_progress()
+        self.root.after(50, self._drain_progress)
+
     def create_status_bar(self):
         """Create status bar with ThingsBoard connection indicator"""
         status_frame = ttk.Frame(self.root)
@@ -100,10 +165,14 @@ class CertificateManagerGUI:
         self.connection_details = ttk.Label(connection_frame, text="")
         self.connection_details.pack(side=tk.LEFT, padx=5)
 
-    def create_certificate_tab(self):
+    def _build_tab(self, tab_id):
+        """Builds the widgets of a notebook tab on first selection"""
+        tab, builder = self._tab_builders.pop(tab_id, (None, None))
+        if builder:
+            builder(tab)
+
+    def create_certificate_tab(self, tab):
         """Create certificate generation tab"""
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Generate Certificates")
         
         # Algorithm selection
         alg_frame = ttk.LabelFrame(tab, text="Certificate Algorithm")
@@ -122,6 +191,7 @@ class CertificateManagerGUI:
         # Key options frame
         self.key_options_frame = ttk.LabelFrame(tab, text="Key Options")
         self.key_options_frame.pack(fill=tk.X, padx=5, pady=5)
+        self._alg_frames = {}
         
         # Initialize key options based on default selection
         self.update_key_options()  # Add this line here
@@ -152,8 +222,9 @@ class CertificateManagerGUI:
         ttk.Button(dir_frame, text="Browse", command=self.browse_output_dir).pack(side=tk.RIGHT)
         
         # Generate button
-        ttk.Button(tab, text="Generate Certificates", 
-                  command=self.generate_certificates).pack(pady=20)
+        self.generate_button = ttk.Button(tab, text="Generate Certificates", 
+                  command=self.generate_certificates)
+        self.generate_button.pack(pady=20)
         
         # Progress
         self.cert_progress_var = tk.StringVar(value="Ready")
@@ -161,10 +232,8 @@ class CertificateManagerGUI:
         self.cert_progress = ttk.Progressbar(tab, mode='determinate')
         self.cert_progress.pack(fill=tk.X, padx=5, pady=5)
 
-    def create_apply_certificates_tab(self):
+    def create_apply_certificates_tab(self, tab):
         """Create tab for applying certificates"""
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Apply Certificates")
         
         # Warning label
         ttk.Label(tab, text="This operation requires administrator privileges",
@@ -181,17 +250,19 @@ class CertificateManagerGUI:
                   command=lambda: self.browse_directory(self.cert_dir)).pack(side=tk.RIGHT)
         
         # Apply button
-        ttk.Button(tab, text="Apply Certificates", 
-                  command=self.apply_certificates).pack(pady=20)
+        self.apply_button = ttk.Button(tab, text="Apply Certificates", 
+                  command=self.apply_certificates)
+        self.apply_button.pack(pady=20)
+        if not self._is_admin:
+            self.apply_button.configure(state='disabled')
+            ttk.Label(tab, text="Run as administrator to enable").pack()
         
         # Progress
         self.apply_progress_var = tk.StringVar(value="Ready")
         ttk.Label(tab, textvariable=self.apply_progress_var).pack()
 
-    def create_device_tab(self):
+    def create_device_tab(self, tab):
         """Create tab for device management"""
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Device Management")
         
         # Device configuration
         config_frame = ttk.LabelFrame(tab, text="Device Configuration")
@@ -208,17 +279,16 @@ class CertificateManagerGUI:
                   command=lambda: self.browse_directory(self.device_cert_dir)).grid(row=1, column=2, padx=5)
         
         # Create device button
-        ttk.Button(tab, text="Create Device", 
-                  command=self.create_device).pack(pady=20)
+        self.create_device_button = ttk.Button(tab, text="Create Device", 
+                  command=self.create_device)
+        self.create_device_button.pack(pady=20)
         
         # Progress
         self.device_progress_var = tk.StringVar(value="Ready")
         ttk.Label(tab, textvariable=self.device_progress_var).pack()
 
-    def create_performance_tab(self):
+    def create_performance_tab(self, tab):
         """Create performance testing tab"""
-        tab = ttk.Frame(self.notebook)
-        self.notebook.add(tab, text="Performance Testing")
         
         # Initialize cipher variables
         self.cipher_vars = {}
@@ -275,6 +345,30 @@ class CertificateManagerGUI:
         ttk.Entry(payload_frame, textvariable=self.payload_var, width=10).pack(side=tk.LEFT, padx=5)
         ttk.Label(payload_frame, text="(1-64)").pack(side=tk.LEFT)
         
+        # Parallel workers
+        workers_frame = ttk.Frame(param_frame)
+        workers_frame.pack(fill=tk.X, pady=2)
+        ttk.Label(workers_frame, text="Parallel workers:").pack(side=tk.LEFT)
+        self.workers_var = tk.StringVar(value="1")
+        ttk.Entry(workers_frame, textvariable=self.workers_var, width=10).pack(side=tk.LEFT, padx=5)
+        ttk.Label(workers_frame, text=f"(1-{MAX_WORKERS}; above 1 runs iterations concurrently and ignores the delay)").pack(side=tk.LEFT)
+        
+        # Connection reuse
+        self.reuse_connection_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            param_frame,
+            text="Reuse connection across iterations (handshake measured once per cipher)",
+            variable=self.reuse_connection_var
+        ).pack(anchor=tk.W, pady=2)
+
+        # TLS session resumption
+        self.resume_tls_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            param_frame,
+            text="Resume TLS sessions (handshakes after the first connection are abbreviated)",
+            variable=self.resume_tls_var
+        ).pack(anchor=tk.W, pady=2)
+        
         # Cipher Selection with scrollbar
         cipher_frame = ttk.LabelFrame(tab, text="Cipher Suites")
         cipher_frame.pack(fill=tk.BOTH, expand=True, pady=5)
@@ -308,81 +402,28 @@ class CertificateManagerGUI:
             if not cert_dir:
                 return
                 
-            # Clear existing checkboxes
-            for widget in scrollable_frame.winfo_children():
-                widget.destroy()
-            
             # Get certificate type
             device_cert_path = os.path.join(cert_dir, "device1.crt")
             cmd = ['x509', '-in', device_cert_path, '-text', '-noout']
-            stdout, stderr = run_command(cmd, tool_name="openssl")
+            stdout, stderr, returncode = run_command(cmd, tool_name="openssl")
             
-            if stderr:
+            if returncode != 0:
                 messagebox.showerror("Error", f"Failed to read certificate: {stderr}")
                 return
 
             # Sort ciphers into compatible and incompatible
             compatible_ciphers, incompatible_ciphers = sort_ciphers_by_compatibility(cert_dir, available_ciphers)
             
-            # Create checkboxes for compatible ciphers first
-            row = 0
-            col = 0
-            for cipher, description in compatible_ciphers.items():
-                var = tk.BooleanVar(value=True)
-                self.cipher_vars[cipher] = var
-                
-                cb = tk.Checkbutton(
-                    scrollable_frame, 
-                    text=f"{cipher}\n({description})", 
-                    variable=var,
-                    wraplength=250,
-                    justify=tk.LEFT
-                )
-                cb.grid(row=row, column=col, sticky='w', padx=5, pady=2)
-                self.cipher_checkboxes[cipher] = cb
-                
-                col += 1
-                if col >= 3:
-                    col = 0
-                    row += 1
-
-            # Add separator if we have both compatible and incompatible ciphers
-            if incompatible_ciphers:
-                ttk.Separator(scrollable_frame, orient='horizontal').grid(
-                    row=row, column=0, columnspan=3, sticky='ew', pady=10
-                )
-                row += 1
-                col = 0
-
-            # Then add incompatible ciphers
-            for cipher, description in incompatible_ciphers.items():
-                var = tk.BooleanVar(value=False)
-                self.cipher_vars[cipher] = var
-                
-                cb = tk.Checkbutton(
-                    scrollable_frame, 
-                    text=f"{cipher}\n({description})", 
-                    variable=var,
-                    wraplength=250,
-                    justify=tk.LEFT,
-                    state='disabled'
-                )
-                cb.grid(row=row, column=col, sticky='w', padx=5, pady=2)
-                self.cipher_checkboxes[cipher] = cb
-                
-                col += 1
-                if col >= 3:
-                    col = 0
-                    row += 1
+            show_cipher_checkboxes(compatible_ciphers, incompatible_ciphers)
 
         # Store checkbox references
         self.cipher_checkboxes = {}
         
         # Get available ciphers from OpenSSL
         cmd = ['ciphers', '-v', 'ALL']
-        stdout, stderr = run_command(cmd, tool_name="openssl")
+        stdout, stderr, returncode = run_command(cmd, tool_name="openssl")
         
-        if stderr:
+        if returncode != 0:
             messagebox.showerror("Error", f"Failed to get cipher list: {stderr}")
             return
             
@@ -409,11 +450,10 @@ class CertificateManagerGUI:
             
             # Get certificate type
             cert_path = os.path.join(cert_dir, "device1.crt")
-            if not os.path.exists(cert_path):
-                return available_ciphers, {}  # Return all as compatible if no certificate
-                
             cmd = ['x509', '-in', cert_path, '-text', '-noout']
-            stdout, _ = run_command(cmd, tool_name="openssl")
+            stdout, _, returncode = run_command(cmd, tool_name="openssl")
+            if returncode != 0:
+                return available_ciphers, {}  # Return all as compatible if the certificate is missing or unreadable
             
             # Determine certificate type
             is_rsa = "Public Key Algorithm: rsaEncryption" in stdout
@@ -439,56 +479,65 @@ class CertificateManagerGUI:
         else:
             compatible_ciphers, incompatible_ciphers = available_ciphers, {}
 
-        # Create checkboxes for compatible ciphers first
-        row = 0
-        col = 0
-        for cipher, description in compatible_ciphers.items():
-            var = tk.BooleanVar(value=True)
-            self.cipher_vars[cipher] = var
+        def show_cipher_checkboxes(compatible_ciphers, incompatible_ciphers):
+            """(Re)builds the checkbox grid; Tk lays the widgets out once, when it next goes idle"""
+            for widget in scrollable_frame.winfo_children():
+                widget.destroy()
+            self.cipher_vars.clear()
+            self.cipher_checkboxes.clear()
+
+            # Create checkboxes for compatible ciphers first
+            row = 0
+            col = 0
+            for cipher, description in compatible_ciphers.items():
+                var = tk.BooleanVar(value=True)
+                self.cipher_vars[cipher] = var
             
-            cb = tk.Checkbutton(
-                scrollable_frame, 
-                text=f"{cipher}\n({description})", 
-                variable=var,
-                wraplength=250,
-                justify=tk.LEFT
-            )
-            cb.grid(row=row, column=col, sticky='w', padx=5, pady=2)
-            self.cipher_checkboxes[cipher] = cb
+                cb = tk.Checkbutton(
+                    scrollable_frame, 
+                    text=f"{cipher}\n({description})", 
+                    variable=var,
+                    wraplength=250,
+                    justify=tk.LEFT
+                )
+                cb.grid(row=row, column=col, sticky='w', padx=5, pady=2)
+                self.cipher_checkboxes[cipher] = cb
             
-            col += 1
-            if col >= 3:
-                col = 0
-                row += 1
+                col += 1
+                if col >= 3:
+                    col = 0
+                    row += 1
 
-        # Add separator if we have both compatible and incompatible ciphers
-        if incompatible_ciphers:
-            ttk.Separator(scrollable_frame, orient='horizontal').grid(
-                row=row, column=0, columnspan=3, sticky='ew', pady=10
-            )
-            row += 1
-            col = 0
+            # Add separator if we have both compatible and incompatible ciphers
+            if incompatible_ciphers:
+                ttk.Separator(scrollable_frame, orient='horizontal').grid(
+                    row=row, column=0, columnspan=3, sticky='ew', pady=10
+                )
+                row += 1
+                col = 0
 
-        # Then add incompatible ciphers
-        for cipher, description in incompatible_ciphers.items():
-            var = tk.BooleanVar(value=False)
-            self.cipher_vars[cipher] = var
+            # Then add incompatible ciphers
+            for cipher, description in incompatible_ciphers.items():
+                var = tk.BooleanVar(value=False)
+                self.cipher_vars[cipher] = var
             
-            cb = tk.Checkbutton(
-                scrollable_frame, 
-                text=f"{cipher}\n({description})", 
-                variable=var,
-                wraplength=250,
-                justify=tk.LEFT,
-                state='disabled'
-            )
-            cb.grid(row=row, column=col, sticky='w', padx=5, pady=2)
-            self.cipher_checkboxes[cipher] = cb
+                cb = tk.Checkbutton(
+                    scrollable_frame, 
+                    text=f"{cipher}\n({description})", 
+                    variable=var,
+                    wraplength=250,
+                    justify=tk.LEFT,
+                    state='disabled'
+                )
+                cb.grid(row=row, column=col, sticky='w', padx=5, pady=2)
+                self.cipher_checkboxes[cipher] = cb
             
-            col += 1
-            if col >= 3:
-                col = 0
-                row += 1
+                col += 1
+                if col >= 3:
+                    col = 0
+                    row += 1
+
+        show_cipher_checkboxes(compatible_ciphers, incompatible_ciphers)
 
         # Add mousewheel scrolling
         def _on_mousewheel(event):
@@ -515,18 +564,23 @@ class CertificateManagerGUI:
         self.perf_progress.pack(fill=tk.X, padx=5, pady=5)
 
     def update_key_options(self):
-        """Update key options based on selected algorithm"""
-        # Clear existing options
-        for widget in self.key_options_frame.winfo_children():
-            widget.destroy()
-        
+        """Show the key options for the selected algorithm; each algorithm's frame is built once and then reused"""
         selected_alg = self.alg_var.get()
-        alg_config = SUPPORTED_ALGORITHMS[selected_alg]
+        if selected_alg not in self._alg_frames:
+            alg_frame = ttk.Frame(self.key_options_frame)
+            self._build_key_options(alg_frame, SUPPORTED_ALGORITHMS[selected_alg])
+            self._alg_frames[selected_alg] = alg_frame
         
+        for alg_frame in self._alg_frames.values():
+            alg_frame.pack_forget()
+        self._alg_frames[selected_alg].pack(fill=tk.X)
+
+    def _build_key_options(self, options_frame, alg_config):
+        """Create the key option widgets for one algorithm inside options_frame"""
         if alg_config["key_options"]["type"] == "none":
             # No options needed for this algorithm
             ttk.Label(
-                self.key_options_frame, 
+                options_frame, 
                 text="No additional options required"
             ).pack(side=tk.LEFT, padx=5)
             return
@@ -534,16 +588,13 @@ class CertificateManagerGUI:
         if alg_config["key_options"]["type"] == "curve":
             # Get available curves if not already populated
             if alg_config["key_options"]["values"] is None:
-                curves_stdout, _ = run_command(['ecparam', '-list_curves'], tool_name="openssl")
-                available_curves = parse_curves(curves_stdout)
-                alg_config["key_options"]["values"] = [curve['name'] for curve in available_curves]
-                alg_config["key_options"]["descriptions"] = {
-                    curve['name']: curve['description'] for curve in available_curves
-                }
-                alg_config["key_options"]["default"] = alg_config["key_options"]["values"][0]
+                descriptions = {curve['name']: curve['description'] for curve in list_curves_cached()}
+                alg_config["key_options"]["values"] = list(descriptions)
+                alg_config["key_options"]["descriptions"] = descriptions
+                alg_config["key_options"]["default"] = DEFAULT_CURVE if DEFAULT_CURVE in descriptions else next(iter(descriptions), DEFAULT_CURVE)
         
             # Create curve selection frame
-            curve_frame = ttk.Frame(self.key_options_frame)
+            curve_frame = ttk.Frame(options_frame)
             curve_frame.pack(fill=tk.X, padx=5)
         
             ttk.Label(curve_frame, text="Curve:").pack(side=tk.LEFT)
@@ -568,16 +619,18 @@ class CertificateManagerGUI:
                 textvariable=self.curve_desc_var
             ).pack(side=tk.LEFT, padx=5)
 
+            # Matches on the curve name or its description; typing on only re-checks the previous matches
+            curve_searcher = FuzzySearcher(
+                self.all_curves,
+                key=lambda curve: (curve, alg_config["key_options"]["descriptions"][curve])
+            )
+
             def filter_curves(*args):
                 """Filter curves based on current text"""
                 search_term = curve_combo.get()
                 
                 # Filter curves based on search term
-                filtered_curves = [
-                    curve for curve in self.all_curves
-                    if fuzzy_search(search_term, curve) or 
-                    fuzzy_search(search_term, alg_config["key_options"]["descriptions"][curve])
-                ]
+                filtered_curves = curve_searcher.search(search_term)
                 
                 # Update dropdown list
                 curve_combo['values'] = filtered_curves
@@ -614,9 +667,9 @@ class CertificateManagerGUI:
 
         elif alg_config["key_options"]["type"] == "bits":
             self.rsa_bits_var = tk.StringVar(value=alg_config["key_options"]["default"])
-            ttk.Label(self.key_options_frame, text="Key Size:").pack(side=tk.LEFT, padx=5)
+            ttk.Label(options_frame, text="Key Size:").pack(side=tk.LEFT, padx=5)
             bits_combo = ttk.Combobox(
-                self.key_options_frame,
+                options_frame,
                 textvariable=self.rsa_bits_var,
                 values=alg_config["key_options"]["values"]
             )
@@ -635,28 +688,53 @@ class CertificateManagerGUI:
             string_var.set(dir_path)
 
     def check_connection_periodically(self):
-        """Periodically check ThingsBoard connection"""
+        """
+        Periodically check ThingsBoard connection. Every cycle only probes the port over TCP;
+        the full HTTP login check runs when the port comes up and then every FULL_CHECK_EVERY cycles.
+        """
+        last_state = None
+        cycles_since_check = 0
         while True:
-            tb_manager = ThingsboardDeviceManager()
-            is_connected = tb_manager.check_connection()
+            with self._tb_lock:
+                tb_manager = self._thingsboard()
+                if not tb_manager.tcp_ping():
+                    state = "offline"
+                elif last_state == "online" and cycles_since_check < FULL_CHECK_EVERY:
+                    state = "online"
+                    cycles_since_check += 1
+                else:
+                    state = "online" if tb_manager.check_connection() else "reachable"
+                    cycles_since_check = 1
             
-            self.root.after(0, self.update_connection_status, is_connected)
-            time.sleep(5)  # Check every 5 seconds
+            # Only a change needs a Tk round-trip; the indicator already shows an unchanged state
+            if state != last_state:
+                self.root.after(0, self.update_connection_status, state)
+
+            # Recheck soon after a change, then every 5s
+            delay = 2 if state != last_state else 5
+            last_state = state
+            if self._stop.wait(delay):
+                return
 
-    def update_connection_status(self, is_connected):
-        """Update the connection status indicator"""
-        color = 'green' if is_connected else 'red'
-        status_text = "ONLINE" if is_connected else "OFFLINE"
+    def update_connection_status(self, state):
+        """Update the connection status indicator; state is 'online', 'reachable' (port open, login failing) or 'offline'"""
+        color = {'online': 'green', 'reachable': 'orange'}.get(state, 'red')
+        status_text = state.upper()
         
         self.status_canvas.itemconfig(self.status_circle, fill=color)
         self.connection_label.config(text=f"ThingsBoard: {status_text}")
         
         # Update connection details
-        if is_connected:
+        if state == 'online':
             self.connection_details.config(
                 text="(tenant@thingsboard.org)",
                 foreground='green'
             )
+        elif state == 'reachable':
+            self.connection_details.config(
+                text="(Server up, login failed)",
+                foreground='orange'
+            )
         else:
             self.connection_details.config(
                 text="(Not Connected)",
@@ -669,95 +747,96 @@ class CertificateManagerGUI:
         if not self.validate_inputs():
             return
 
-        # Start progress
-        self.cert_progress_var.set("Starting certificate generation...")
-        self.cert_progress['value'] = 0
-        self.root.update()
+        # Ask before overwriting on the Tk thread; the worker wipes and recreates the directory
+        output_dir = self.output_dir.get()
+        remove_existing = os.path.exists(output_dir)
+        if remove_existing and not messagebox.askyesno("Directory exists", 
+                f"Directory '{output_dir}' already exists. Overwrite?"):
+            return
+
+        # Tk variables are read here; the worker thread only gets plain values
+        alg = self.alg_var.get()
+        settings = {
+            "alg_choice": alg,
+            "curve_choice": self.curve_var.get() if alg == 'EC' else None,
+            "rsa_bits_choice": int(self.rsa_bits_var.get()) if alg == 'RSA' else None,
+            "output_dir": output_dir,
+            "remove_existing": remove_existing,
+            "ca_subj": f"/CN={self.ca_cn.get()}",
+            "server_subj": f"/CN={self.server_cn.get()}",
+            "device_subj": f"/CN={self.device_cn.get()}",
+        }
+
+        self.generate_button.configure(state='disabled')
+        self._set_cert_progress(0, "Starting certificate generation...")
+        threading.Thread(target=self._generate_certificates_thread, kwargs=settings, daemon=True).start()
+
+    def _set_cert_progress(self, value, text):
+        """Queues a certificate-generation progress update"""
+        self._post_progress('cert', text, value)
+
+    def _generate_certificates_thread(self, alg_choice, curve_choice, rsa_bits_choice, output_dir, remove_existing, ca_subj, server_subj, device_subj):
+        """Run certificate generation in a separate thread"""
+        # Setup filenames
+        ca_key_fn = "ca.key"
+        ca_cert_fn = "ca.crt"
+        server_key_fn = "server.key"
+        server_cert_fn = "server.crt"
+        device_key_fn = "device1.key"
+        device_cert_fn = "device1.crt"
+        server_p12_fn = "server.p12"
+        server_keystore_fn = "server_keystore.jks"
+        truststore_fn = "server_truststore.jks"
 
         try:
             # Create output directory
-            output_dir = self.output_dir.get()
-            if os.path.exists(output_dir):
-                if not messagebox.askyesno("Directory exists", 
-                    f"Directory '{output_dir}' already exists. Overwrite?"):
-                    return
+            if remove_existing:
+                self._set_cert_progress(0, "Removing existing directory...")
                 try:
-                    shutil.rmtree(output_dir)
+                    remove_tree(output_dir)
                 except Exception as e:
-                    messagebox.showerror("Error", f"Could not remove existing directory: {e}")
-                    return
-
-            os.makedirs(output_dir, exist_ok=True)
+                    raise Exception(f"Could not remove existing directory: {e}")
+            try:
+                os.makedirs(output_dir, exist_ok=True)
+            except Exception as e:
+                raise Exception(f"Could not create output directory: {e}")
 
-            # Setup filenames
-            ca_key_fn = "ca.key"
-            ca_cert_fn = "ca.crt"
-            ca_srl_fn = "ca.srl"
-            server_key_fn = "server.key"
-            server_cert_fn = "server.crt"
-            device_key_fn = "device1.key"
-            device_cert_fn = "device1.crt"
-            server_p12_fn = "server.p12"
-            server_keystore_fn = "server_keystore.jks"
-            truststore_fn = "server_truststore.jks"
+            # Generate all private keys in parallel (10%)
+            self._set_cert_progress(10, "Generating private keys...")
+            if not prewarm_keys(alg_choice, curve_choice, rsa_bits_choice, output_dir):
+                raise Exception("Failed to generate private keys")
 
             # Generate CA Certificate (20%)
-            self.cert_progress_var.set("Generating CA certificate...")
-            self.cert_progress['value'] = 20
-            self.root.update()
-
-            ca_subj = f"/CN={self.ca_cn.get()}"
-            if not generate_ca_certificate(
-                self.alg_var.get(),
-                self.curve_var.get() if self.alg_var.get() == 'EC' else None,
-                int(self.rsa_bits_var.get()) if self.alg_var.get() == 'RSA' else None,
+            self._set_cert_progress(20, "Generating CA certificate...")
+            ca = generate_ca_certificate(
+                alg_choice,
+                curve_choice,
+                rsa_bits_choice,
                 output_dir,
-                ca_subj
-            ):
+                ca_subj,
+                use_existing_key=True
+            )
+            if not ca:
                 raise Exception("Failed to generate CA certificate")
 
-            # Generate Server Certificate (40%)
-            self.cert_progress_var.set("Generating server certificate...")
-            self.cert_progress['value'] = 40
-            self.root.update()
-
-            server_subj = f"/CN={self.server_cn.get()}"
-            if not generate_signed_certificate(
-                "server",
-                ca_key_fn,
-                ca_cert_fn,
-                ca_srl_fn,
-                self.alg_var.get(),
-                self.curve_var.get() if self.alg_var.get() == 'EC' else None,
-                int(self.rsa_bits_var.get()) if self.alg_var.get() == 'RSA' else None,
+            # Generate Server and Device Certificates concurrently (40%)
+            self._set_cert_progress(40, "Generating server and device certificates...")
+            results = generate_signed_certificates_batch(
+                [("server", server_subj), ("device1", device_subj)],
+                ca,
+                alg_choice,
+                curve_choice,
+                rsa_bits_choice,
                 output_dir,
-                server_subj
-            ):
+                use_existing_key=True
+            )
+            if not results["server"]:
                 raise Exception("Failed to generate server certificate")
-
-            # Generate Device Certificate (60%)
-            self.cert_progress_var.set("Generating device certificate...")
-            self.cert_progress['value'] = 60
-            self.root.update()
-
-            device_subj = f"/CN={self.device_cn.get()}"
-            if not generate_signed_certificate(
-                "device1",
-                ca_key_fn,
-                ca_cert_fn,
-                ca_srl_fn,
-                self.alg_var.get(),
-                self.curve_var.get() if self.alg_var.get() == 'EC' else None,
-                int(self.rsa_bits_var.get()) if self.alg_var.get() == 'RSA' else None,
-                output_dir,
-                device_subj
-            ):
+            if not results["device1"]:
                 raise Exception("Failed to generate device certificate")
 
             # Generate PKCS12 and JKS (80%)
-            self.cert_progress_var.set("Generating PKCS12 and JKS files...")
-            self.cert_progress['value'] = 80
-            self.root.update()
+            self._set_cert_progress(80, "Generating PKCS12 and JKS files...")
 
             # Use default "changeit" password for all stores
             p12_password = "changeit"
@@ -794,12 +873,8 @@ class CertificateManagerGUI:
             ):
                 raise Exception("Failed to create truststore")
 
-            # Complete (100%)
-            self.cert_progress['value'] = 100
-            self.cert_progress_var.set("Certificate generation complete!")
-            
             # Show success message with file list
-            messagebox.showinfo("Success", 
+            self.root.after(0, self._certificate_generation_completed,
                 f"Certificates generated successfully in:\n{os.path.abspath(output_dir)}\n\n"
                 f"Files generated:\n"
                 f"- CA: {ca_key_fn}, {ca_cert_fn}\n"
@@ -809,9 +884,23 @@ class CertificateManagerGUI:
             )
 
         except Exception as e:
-            self.cert_progress['value'] = 0
-            self.cert_progress_var.set("Certificate generation failed!")
-            messagebox.showerror("Error", str(e))
+            self.root.after(0, self._certificate_generation_failed, str(e))
+
+    def _certificate_generation_completed(self, summary):
+        """Called when certificate generation completes successfully"""
+        self._apply_queued_progress()
+        self.cert_progress['value'] = 100
+        self.cert_progress_var.set("Certificate generation complete!")
+        self.generate_button.configure(state='normal')
+        messagebox.showinfo("Success", summary)
+
+    def _certificate_generation_failed(self, error_msg):
+        """Called when certificate generation fails"""
+        self._apply_queued_progress()
+        self.cert_progress['value'] = 0
+        self.cert_progress_var.set("Certificate generation failed!")
+        self.generate_button.configure(state='normal')
+        messagebox.showerror("Error", error_msg)
 
     def validate_inputs(self) -> bool:
         """Validate all inputs before starting certificate generation"""
@@ -835,12 +924,8 @@ class CertificateManagerGUI:
 
     def apply_certificates(self):
         """Handle applying certificates to services"""
-        # Check admin rights
-        if not ctypes.windll.shell32.IsUserAnAdmin():
-            messagebox.showerror(
-                "Administrator Rights Required", 
-                "This operation requires administrator privileges.\nPlease run the application as administrator."
-            )
+        # Check admin rights (the button is disabled up front when they are missing)
+        if not self._is_admin:
             return
 
         # Validate certificate directory
@@ -853,7 +938,7 @@ class CertificateManagerGUI:
         keystore_path = os.path.join(cert_dir, "server_keystore.jks")
         truststore_path = os.path.join(cert_dir, "server_truststore.jks")
         
-        if not os.path.exists(keystore_path) or not os.path.exists(truststore_path):
+        if find_missing_files(cert_dir, ["server_keystore.jks", "server_truststore.jks"]):
             messagebox.showerror(
                 "Files Not Found", 
                 f"Required JKS files not found in selected directory:\n"
@@ -862,44 +947,79 @@ class CertificateManagerGUI:
             )
             return
 
+        self.apply_button.configure(state='disabled')
+        self.apply_progress_var.set("Stopping ThingsBoard service...")
+        threading.Thread(
+            target=self._apply_certificates_thread,
+            args=(keystore_path, truststore_path),
+            daemon=True
+        ).start()
+
+    def _ask_yes_no(self, title, message):
+        """Shows a yes/no dialog on the Tk thread and blocks the calling worker thread until it is answered"""
+        answer = {}
+        answered = threading.Event()
+
+        def ask():
+            answer["value"] = messagebox.askyesno(title, message)
+            answered.set()
+
+        self.root.after(0, ask)
+        answered.wait()
+        return answer["value"]
+
+    def _apply_certificates_thread(self, keystore_path, truststore_path):
+        """Stop ThingsBoard, copy the keystores and restart it in a separate thread"""
+        def set_status(text):
+            self._post_progress('apply', text)
+
+        def finish(status, dialog=None, title=None, message=None):
+            def done():
+                self._apply_queued_progress()
+                self.apply_progress_var.set(status)
+                self.apply_button.configure(state='normal')
+                if dialog:
+                    dialog(title, message)
+            self.root.after(0, done)
+
         try:
-            # Update progress
-            self.apply_progress_var.set("Stopping ThingsBoard service...")
-            self.root.update()
-
-            # Stop ThingsBoard
-            stop_result = os.system('net stop thingsboard')
-            if stop_result != 0:
-                if not messagebox.askyesno(
+            # Stop ThingsBoard, reading the source files while it shuts down
+            copy_targets = {keystore_path: "server_keystore.jks", truststore_path: "server_truststore.jks"}
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                read_future = executor.submit(read_files, copy_targets)
+                stopped = control_service("stop")
+            if not stopped:
+                if not self._ask_yes_no(
                     "Service Stop Failed",
                     "Failed to stop ThingsBoard service. Continue anyway?\n"
                     "Files might still be copyable if service is not running."
                 ):
+                    finish("Operation cancelled")
                     return
 
             # Copy files
-            self.apply_progress_var.set("Copying certificate files...")
-            self.root.update()
+            set_status("Copying certificate files...")
 
             try:
                 # Ensure target directory exists
                 os.makedirs(THINGSBOARD_CONF_PATH, exist_ok=True)
                 
-                # Copy files with overwrite
-                shutil.copy2(keystore_path, os.path.join(THINGSBOARD_CONF_PATH, "server_keystore.jks"))
-                shutil.copy2(truststore_path, os.path.join(THINGSBOARD_CONF_PATH, "server_truststore.jks"))
+                # Write file contents with overwrite; the service does not need the source metadata
+                for source_path, contents in read_future.result().items():
+                    with open(os.path.join(THINGSBOARD_CONF_PATH, copy_targets[source_path]), 'wb') as target_file:
+                        target_file.write(contents)
                 
             except Exception as e:
-                messagebox.showerror("Copy Error", f"Error copying files: {str(e)}")
+                finish("Operation failed!", messagebox.showerror, "Copy Error", f"Error copying files: {str(e)}")
                 return
 
             # Start ThingsBoard
-            self.apply_progress_var.set("Starting ThingsBoard service...")
-            self.root.update()
+            set_status("Starting ThingsBoard service...")
 
-            start_result = os.system('net start thingsboard')
-            if start_result != 0:
-                messagebox.showerror(
+            if not control_service("start"):
+                finish(
+                    "Operation failed!",
+                    messagebox.showerror,
                     "Service Start Failed",
                     "Failed to start ThingsBoard service.\n"
                     "Please start it manually from Services."
@@ -907,15 +1027,15 @@ class CertificateManagerGUI:
                 return
 
             # Success
-            self.apply_progress_var.set("Certificates applied successfully!")
-            messagebox.showinfo(
+            finish(
+                "Certificates applied successfully!",
+                messagebox.showinfo,
                 "Success", 
                 "Certificates applied successfully!\nThingsBoard service restarted. Please wait up to a minute for it to come online."
             )
 
         except Exception as e:
-            messagebox.showerror("Error", f"Error applying certificates: {str(e)}")
-            self.apply_progress_var.set("Operation failed!")
+            finish("Operation failed!", messagebox.showerror, "Error", f"Error applying certificates: {str(e)}")
 
     def create_device(self):
         """Handle device creation workflow"""
@@ -929,7 +1049,7 @@ class CertificateManagerGUI:
         ca_cert_path = os.path.join(cert_dir, "ca.crt")
         device_cert_path = os.path.join(cert_dir, "device1.crt")
         
-        if not os.path.exists(device_cert_path) or not os.path.exists(ca_cert_path):
+        if find_missing_files(cert_dir, ["ca.crt", "device1.crt"]):
             messagebox.showerror(
                 "Files Not Found",
                 f"Required certificate files not found in selected directory:\n"
@@ -944,67 +1064,67 @@ class CertificateManagerGUI:
             device_name = "device001"  # Default name if empty
         
         # 3. Start device creation process
+        self.create_device_button.configure(state='disabled')
         self.device_progress_var.set("Connecting to ThingsBoard...")
-        self.root.update()
-
-        try:
-            tb_manager = ThingsboardDeviceManager()
-            if not tb_manager.login():
-                messagebox.showerror(
-                    "Connection Error",
-                    "Failed to connect to ThingsBoard.\nPlease ensure the server is running."
-                )
-                self.device_progress_var.set("Connection failed")
-                return
+        threading.Thread(
+            target=self._create_device_thread,
+            args=(device_name, ca_cert_path, device_cert_path),
+            daemon=True
+        ).start()
+
+    def _create_device_thread(self, device_name, ca_cert_path, device_cert_path):
+        """Create and configure the ThingsBoard device in a separate thread"""
+        def set_status(text):
+            self._post_progress('device', text)
+
+        def finish(status, dialog, title, message):
+            def done():
+                self._apply_queued_progress()
+                self.device_progress_var.set(status)
+                self.create_device_button.configure(state='normal')
+                dialog(title, message)
+            self.root.after(0, done)
+
+        with self._tb_lock:
+            try:
+                tb_manager = self._thingsboard()
+                if not tb_manager.ensure_login():
+                    finish(
+                        "Connection failed",
+                        messagebox.showerror,
+                        "Connection Error",
+                        "Failed to connect to ThingsBoard.\nPlease ensure the server is running."
+                    )
+                    return
 
-            # Create device profile
-            self.device_progress_var.set("Creating device profile...")
-            self.root.update()
+                # Create device profile
+                set_status("Creating device profile...")
             
-            profile_name = f"Profile_{device_name}"
-            profile = tb_manager.create_profile_with_certificate(profile_name, ca_cert_path)
-            if not profile:
-                raise Exception("Failed to create device profile")
-
-            # Create device
-            self.device_progress_var.set("Creating device...")
-            self.root.update()
-            
-            device_id = tb_manager.create_device_with_profile(
-                device_name=device_name,
-                profile_name=profile_name
-            )
-            if not device_id:
-                raise Exception("Failed to create device")
+                profile_name = f"Profile_{device_name}"
+                profile = tb_manager.create_profile_with_certificate(profile_name, ca_cert_path)
+                if not profile:
+                    raise Exception("Failed to create device profile")
 
-            # Update device credentials
-            self.device_progress_var.set("Updating device credentials...")
-            self.root.update()
+                # Create device together with its X.509 credentials
+                set_status("Creating device with certificate credentials...")
             
-            device_credentials = tb_manager.get_device_credentials(device_id=device_id)
-            if not device_credentials:
-                raise Exception("Failed to get device credentials")
-
-            if not tb_manager.post_modify_device_credentials(
-                credentials=device_credentials,
-                device_id=device_id,
-                cert_path=device_cert_path
-            ):
-                raise Exception("Failed to update device credentials")
-
-            # Success
-            self.device_progress_var.set("Device created successfully!")
-            messagebox.showinfo(
-                "Success",
-                f"Successfully created and configured device '{device_name}'\n\n"
-                f"Profile: {profile_name}\n"
-                f"Device ID: {device_id}\n"
-                f"Certificate: {os.path.basename(device_cert_path)}"
-            )
+                device_id = tb_manager.create_device_with_certificate(device_name, profile_name, device_cert_path)
+                if not device_id:
+                    raise Exception("Failed to create device with certificate credentials")
+
+                # Success
+                finish(
+                    "Device created successfully!",
+                    messagebox.showinfo,
+                    "Success",
+                    f"Successfully created and configured device '{device_name}'\n\n"
+                    f"Profile: {profile_name}\n"
+                    f"Device ID: {device_id}\n"
+                    f"Certificate: {os.path.basename(device_cert_path)}"
+                )
 
-        except Exception as e:
-            self.device_progress_var.set("Device creation failed!")
-            messagebox.showerror("Error", str(e))
+            except Exception as e:
+                finish("Device creation failed!", messagebox.showerror, "Error", str(e))
 
     def run_performance_test(self):
         """Start performance test execution"""
@@ -1013,6 +1133,7 @@ class CertificateManagerGUI:
             iterations = int(self.iterations_var.get())
             delay = int(self.delay_var.get())
             payload_size = int(self.payload_var.get())
+            workers = int(self.workers_var.get())
             
             if not (1 <= iterations <= 10000):
                 raise ValueError("Iterations must be between 1 and 10000")
@@ -1020,6 +1141,10 @@ class CertificateManagerGUI:
                 raise ValueError("Delay must be between 0 and 3600 seconds")
             if not (1 <= payload_size <= 64):
                 raise ValueError("Payload size must be between 1 and 64 KB")
+            if not (1 <= workers <= MAX_WORKERS):
+                raise ValueError(f"Parallel workers must be between 1 and {MAX_WORKERS}")
+            if workers > 1 and self.reuse_connection_var.get():
+                raise ValueError("Connection reuse runs iterations one after another; set parallel workers to 1")
                 
         except ValueError as e:
             messagebox.showerror("Invalid Input", str(e))
@@ -1033,20 +1158,19 @@ class CertificateManagerGUI:
 
         # Check required files
         required_files = ["ca.crt", "device1.crt", "device1.key"]
-        for file in required_files:
-            if not os.path.exists(os.path.join(cert_dir, file)):
-                messagebox.showerror(
-                    "Files Not Found",
-                    f"Missing required file: {file}\n"
-                    f"Please select a directory containing the device certificates."
-                )
-                return
+        for file in find_missing_files(cert_dir, required_files):
+            messagebox.showerror(
+                "Files Not Found",
+                f"Missing required file: {file}\n"
+                f"Please select a directory containing the device certificates."
+            )
+            return
 
-        # Get selected ciphers
-        selected_ciphers = [
+        # Get selected ciphers (read here on the Tk thread; the worker only sees this tuple)
+        selected_ciphers = tuple(
             cipher for cipher, var in self.cipher_vars.items() 
             if var.get()
-        ]
+        )
         if not selected_ciphers:
             messagebox.showerror("Error", "Please select at least one cipher suite")
             return
@@ -1054,11 +1178,15 @@ class CertificateManagerGUI:
         # Add cancellation flag
         self.test_cancelled = False
         
-        # Configure test
+        # Configure test (paho-mqtt is only imported once a test is actually run)
+        from .performance_tester import PerformanceTest
         tester = PerformanceTest()
         tester.cert_dir = cert_dir
         tester.iterations = iterations
         tester.delay = delay
+        tester.workers = workers
+        tester.reuse_connection = self.reuse_connection_var.get()
+        tester.resume_tls_session = self.resume_tls_var.get()
         tester.payload_size = payload_size * 1024  # Convert KB to bytes
         tester.selected_ciphers = selected_ciphers
         tester.output_file = self.perf_output_var.get()
@@ -1081,75 +1209,125 @@ class CertificateManagerGUI:
             daemon=True
         )
         self.test_thread.start()
+        self._test_running = True
+        self.root.after(100, self._poll_progress)
 
     def _run_performance_test_thread(self, tester):
         """Run performance test in separate thread"""
         try:
-            from .mqtt.test_runner import run_mqtt_test, calculate_statistics, MqttTestConfig
-            from .mqtt.excel_handler import export_results_to_excel
+            from .mqtt.test_runner import run_mqtt_test, run_mqtt_test_reused, run_mqtt_tests_concurrently, wait_for_next_iteration, calculate_statistics, build_test_configs
+            from .mqtt.excel_handler import PartialResultsWriter, ResultsWorkbook
 
-            all_run_data = {}
-            
-            # Create test configurations
-            test_configs = {}
-            for cipher in tester.selected_ciphers:
-                config_name = f"Test_{cipher}"
-                config = MqttTestConfig(
-                    host="localhost",
-                    port=8883,
-                    tls=True,
-                    ca_certs=os.path.join(tester.cert_dir, "ca.crt"),
-                    certfile=os.path.join(tester.cert_dir, "device1.crt"),
-                    keyfile=os.path.join(tester.cert_dir, "device1.key"),
-                    ciphers=cipher,
-                    payload_size=tester.payload_size
-                )
-                test_configs[config_name] = config
+            test_configs = build_test_configs(
+                tester.cert_dir, tester.selected_ciphers,
+                payload_size=tester.payload_size, resume_tls_session=tester.resume_tls_session
+            )
 
-            # Run tests for each configuration
-            for config_name, config in test_configs.items():
-                # Check if cancelled
-                if self.test_cancelled:
-                    self.root.after(0, self._performance_test_cancelled)
-                    return
-                
-                iteration_results = []
-                
-                for i in range(1, tester.iterations + 1):
-                    # Check if cancelled
-                    if self.test_cancelled:
+            # Each iteration is also appended to a CSV right away, so nothing measured is lost on cancel
+            partial_results = PartialResultsWriter(tester.output_file)
+            self._partial_results_path = partial_results.path
+            exported = False
+            try:
+                # Each configuration's sheet is written as soon as all of its iterations are done
+                results_workbook = ResultsWorkbook(tester.output_file, calculate_statistics)
+
+                # Run tests, either concurrently on worker threads or one iteration at a time
+                if tester.workers > 1:
+                    all_run_data = self._run_iterations_parallel(tester, test_configs, run_mqtt_tests_concurrently, partial_results)
+                    if all_run_data is None:
                         self.root.after(0, self._performance_test_cancelled)
                         return
-                    
-                    # Update progress
-                    self.completed_tests += 1
-                    self.root.after(0, self._update_progress)
-                    
-                    # Run test iteration
-                    run_state = run_mqtt_test(i, config_name, config.__dict__)
-                    iteration_data = run_state.get_results_dict()
-                    iteration_results.append(iteration_data)
-
-                    if tester.delay > 0 and i < tester.iterations:
-                        time.sleep(tester.delay)
-
-                all_run_data[config_name] = iteration_results
-
-            # Export results if not cancelled
-            if not self.test_cancelled:
-                export_results_to_excel(
-                    all_run_data=all_run_data,
-                    excel_filename=tester.output_file,
-                    calculate_statistics=calculate_statistics
-                )
-                self.root.after(0, self._performance_test_completed, tester.output_file)
-            else:
-                self.root.after(0, self._performance_test_cancelled)
+                    for config_name, iteration_results in all_run_data.items():
+                        results_workbook.add(config_name, iteration_results)
+                else:
+                    # Run tests for each configuration
+                    for config_name, config in test_configs.items():
+                        # Check if cancelled
+                        if self.test_cancelled:
+                            self.root.after(0, self._performance_test_cancelled)
+                            return
+                
+                        iteration_results = []
+                        client_config = config.__dict__  # same dict for every iteration of this cipher
+                        # With connection reuse, one warm connection serves every iteration of this cipher
+                        reused = run_mqtt_test_reused(config_name, client_config, tester.iterations) if tester.reuse_connection else None
+                        try:
+                            next_start = time.perf_counter()
+
+                            for i in range(1, tester.iterations + 1):
+                                # Check if cancelled
+                                if self.test_cancelled:
+                                    self.root.after(0, self._performance_test_cancelled)
+                                    return
+
+                                # Iterations start tester.delay seconds apart
+                                next_start = wait_for_next_iteration(next_start, tester.delay)
+
+                                # Update progress (shown by _poll_progress)
+                                self.completed_tests += 1
+
+                                # Run test iteration
+                                if reused is not None:
+                                    iteration_data = next(reused, None)
+                                    if iteration_data is None:
+                                        # The connect failed and was reported as one failed iteration
+                                        self.completed_tests += tester.iterations - i
+                                        break
+                                else:
+                                    run_state = run_mqtt_test(i, config_name, client_config)
+                                    iteration_data = run_state.get_results_dict()
+                                iteration_results.append(iteration_data)
+                                partial_results.write(config_name, iteration_data)
+                        finally:
+                            # Return the warm connection on every exit, not only on cancel
+                            if reused is not None:
+                                reused.close()
+
+                        partial_results.flush()
+                        results_workbook.add(config_name, iteration_results)
+
+                # Finish the workbook if not cancelled
+                if not self.test_cancelled:
+                    # The CSV is only dropped if the workbook was actually written (close reports errors with {})
+                    exported = bool(results_workbook.close())
+                    self.root.after(0, self._performance_test_completed, ', '.join(results_workbook.paths))
+                else:
+                    self.root.after(0, self._performance_test_cancelled)
+            finally:
+                partial_results.close(keep=not exported)
                 
         except Exception as e:
             if not self.test_cancelled:
                 self.root.after(0, self._performance_test_failed, str(e))
 
+    def _run_iterations_parallel(self, tester, test_configs, run_concurrently, partial_results):
+        """
+        Runs all (configuration, iteration) pairs on tester.workers threads.
+        Returns the same {config_name: [results in iteration order]} mapping as the sequential
+        loop, or None if the test was cancelled. The delay between iterations does not apply here.
+        """
+        all_run_data = {config_name: [None] * tester.iterations for config_name in test_configs}
+        client_configs = {config_name: config.__dict__ for config_name, config in test_configs.items()}
+        results = run_concurrently(client_configs, tester.iterations, tester.workers)
+        try:
+            for config_name, iteration_data in results:
+                if self.test_cancelled:
+                    return None
+                all_run_data[config_name][iteration_data['iteration'] - 1] = iteration_data
+                partial_results.write(config_name, iteration_data)
+                self.completed_tests += 1
+        finally:
+            results.close()
+        return all_run_data
+
+    def _poll_progress(self):
+        """Refreshes the progress display from self.completed_tests at most 10 times a second while a test runs"""
+        if not self._test_running:
+            return
+        if not self.test_cancelled:
+            self._update_progress()
+        self.root.after(100, self._poll_progress)
+
     def _update_progress(self):
         """Update the progress bar and status text"""
         self.perf_progress['value'] = self.completed_tests
@@ -1166,15 +1344,17 @@ class CertificateManagerGUI:
 
     def _performance_test_cancelled(self):
         """Called when test is cancelled"""
+        self._test_running = False
         self.perf_progress.stop()
         self.perf_progress_var.set("Test cancelled")
         messagebox.showinfo(
             "Cancelled", 
-            "Performance test cancelled.\nPartial results were not saved."
+            f"Performance test cancelled.\nPartial results saved to: {self._partial_results_path}"
         )
 
     def _performance_test_completed(self, output_file):
         """Called when performance test completes successfully"""
+        self._test_running = False
         self.perf_progress['value'] = self.total_tests
         self.perf_progress_var.set("Test completed!")
         messagebox.showinfo(
@@ -1184,6 +1364,7 @@ class CertificateManagerGUI:
 
     def _performance_test_failed(self, error_msg):
         """Called when performance test fails"""
+        self._test_running = False
         self.perf_progress.stop()
         self.perf_progress_var.set("Test failed!")
         messagebox.showerror(
@@ -1,21 +1,39 @@
+import functools
+import logging
+import re
+import shutil
 import subprocess
+import time
+
+_log = logging.getLogger(__name__)
+
+# Tools already confirmed available by check_tool_version, mapped to their version output
+_tool_versions = {}
+
+@functools.lru_cache(maxsize=8)
+def resolve_tool(tool_name):
+    """Resolves a tool to its absolute path once per process; falls back to the bare name."""
+    return shutil.which(tool_name) or tool_name
 
 def run_command(command_list, working_dir=None, tool_name="openssl"):
     """
-    Executes a command (openssl or keytool) and returns its output.
+    Executes a command (openssl or keytool) and returns (stdout, stderr, returncode).
     Command_list should be a list of arguments, not including the tool itself.
     tool_name should be 'openssl' or 'keytool'.
+    Success is signalled by returncode == 0 only: openssl writes progress and informational
+    text to stderr. returncode is None if the tool could not be started.
     """
     try:
         # Prepend the tool name to the command list
         command_to_run = [tool_name] + command_list
 
-        print(f"Executing: {' '.join(command_to_run)}") # Log the command being run
-        # For commands requiring password input like keytool, Popen might need special handling
-        # if we weren't passing passwords via command line args.
-        # Here, we assume passwords are part of command_list for keytool where appropriate.
-        process = subprocess.Popen(command_to_run, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=working_dir)
-        stdout, stderr = process.communicate()
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug(f"Executing: {' '.join(command_to_run)}") # Log the command being run
+        command_to_run[0] = resolve_tool(tool_name)
+        # The argv list is passed straight to the process (shell=False): no shell is spawned and
+        # arguments such as passwords are never re-parsed or interpolated into a command string.
+        process = subprocess.run(command_to_run, shell=False, capture_output=True, text=True, cwd=working_dir, check=False)
+        stdout, stderr = process.stdout, process.stderr
 
         if process.returncode != 0:
             error_message = f"Error executing command: {' '.join(command_to_run)}\n"
@@ -23,19 +41,21 @@ def run_command(command_list, working_dir=None, tool_name="openssl"):
                 error_message += f"STDERR: {stderr.strip()}\n"
             if stdout: # Some tools might output errors to stdout
                 error_message += f"STDOUT: {stdout.strip()}\n"
-            print(error_message)
-            return None, stderr # Return None for stdout, and the stderr
-        return stdout, None # Return stdout and None for stderr
+            _log.warning(error_message.rstrip())
+        return stdout, stderr, process.returncode
     except FileNotFoundError:
-        print(f"Error: {tool_name} command not found. Please ensure {tool_name} is installed and in your system's PATH.")
-        return None, f"{tool_name} not found."
+        _log.error(f"Error: {tool_name} command not found. Please ensure {tool_name} is installed and in your system's PATH.")
+        return None, f"{tool_name} not found.", None
     except Exception as e:
-        print(f"An unexpected error occurred while running {' '.join(command_to_run)}: {e}")
-        return None, str(e)
+        _log.error(f"An unexpected error occurred while running {' '.join(command_to_run)}: {e}")
+        return None, str(e), None
 
 def check_tool_version(tool_name):
     """Checks if a tool (openssl or keytool) is available and prints its version."""
-    print(f"\n--- Checking {tool_name.capitalize()} Version ---")
+    _log.debug(f"--- Checking {tool_name.capitalize()} Version ---")
+    if tool_name in _tool_versions:
+        _log.info(_tool_versions[tool_name])
+        return True
     
     if tool_name == "keytool":
         # For keytool, use -help to check availability
@@ -43,20 +63,65 @@ def check_tool_version(tool_name):
     else:
         command = ['version']  # For openssl
     
-    version_stdout, version_stderr = run_command(command, tool_name=tool_name)
+    version_stdout, _, returncode = run_command(command, tool_name=tool_name)
     
     if tool_name == "keytool":
         # For keytool, check if we can execute it at all
-        if version_stdout is not None or version_stderr is not None:
-            print(f"{tool_name.capitalize()} is available")
+        if returncode is not None:
+            _tool_versions[tool_name] = f"{tool_name.capitalize()} is available"
+            _log.info(_tool_versions[tool_name])
             return True
-        # If both stdout and stderr are None, it means run_command failed
+        # A returncode of None means the tool could not be started at all
         return False
     else:
         # For openssl, check actual version output
-        if version_stdout:
-            print(version_stdout.strip())
+        if returncode == 0 and version_stdout:
+            _tool_versions[tool_name] = version_stdout.strip()
+            _log.info(_tool_versions[tool_name])
             return True
     
-    print(f"Could not find {tool_name}. Please ensure it is installed and in your system's PATH.")
-    return False
\ No newline at end of file
+    _log.error(f"Could not find {tool_name}. Please ensure it is installed and in your system's PATH.")
+    return False
+
+# Windows-only flag that keeps net/sc from flashing a console window when started from the GUI
+_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+# SERVICE_STATE reported by 'sc query' once a 'net stop'/'net start' has fully taken effect
+_SERVICE_TARGET_STATES = {"stop": "STOPPED", "start": "RUNNING"}
+
+_SERVICE_STATE_RE = re.compile(r"^\s*STATE\s*:\s*\d+\s+(\w+)", re.MULTILINE)
+
+def query_service_state(service_name):
+    """Returns the state reported by 'sc query <service_name>' (e.g. 'RUNNING', 'STOP_PENDING'), or None."""
+    try:
+        result = subprocess.run(['sc', 'query', service_name], capture_output=True, text=True, check=False, creationflags=_NO_WINDOW)
+    except FileNotFoundError:
+        return None
+    match = _SERVICE_STATE_RE.search(result.stdout or "")
+    return match.group(1) if match else None
+
+def control_service(action, service_name="thingsboard", timeout=60):
+    """
+    Runs 'net <action> <service_name>' without a shell. Returns True once the service reached the
+    requested state. net gives up on services that are slow to stop/start while they are still
+    pending, so in that case the state is polled with 'sc query' for up to timeout seconds.
+    """
+    try:
+        result = subprocess.run(['net', action, service_name], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False, creationflags=_NO_WINDOW)
+    except FileNotFoundError:
+        _log.error("Error: net command not found. Service control is only available on Windows.")
+        return False
+    if result.returncode == 0:
+        return True
+
+    target_state = _SERVICE_TARGET_STATES.get(action)
+    deadline = time.monotonic() + timeout
+    state = query_service_state(service_name)
+    while target_state and state and state.endswith("_PENDING") and time.monotonic() < deadline:
+        time.sleep(1)
+        state = query_service_state(service_name)
+    if target_state and state == target_state:
+        return True
+    if result.stderr:
+        _log.error(result.stderr.strip())
+    return False
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+import tempfile
+
+def list_subdirectories(path='.'):
+    """Returns the names of the directories in path using a single scandir pass"""
+    with os.scandir(path) as entries:
+        return [entry.name for entry in entries if entry.is_dir()]
+
+def find_missing_files(directory, filenames):
+    """Returns the filenames not present in directory, in the order given"""
+    try:
+        with os.scandir(directory) as entries:
+            present = {entry.name for entry in entries}
+    except OSError:
+        present = set()
+    return [filename for filename in filenames if filename not in present]
+
+def read_files(paths):
+    """Reads each file fully into memory. Returns a dict of path -> bytes"""
+    contents = {}
+    for path in paths:
+        with open(path, 'rb') as source_file:
+            contents[path] = source_file.read()
+    return contents
+
+def remove_tree(path):
+    """
+    Deletes a directory tree. On Windows each DeleteFile call pays its own latency (high on network
+    volumes), so the files are unlinked in parallel before the emptied directories are removed bottom-up.
+    Elsewhere unlinking is cheap and shutil.rmtree is used as-is.
+    """
+    if os.name != 'nt':
+        shutil.rmtree(path)
+        return
+    files, directories = [], []
+    pending = [path]
+    while pending:
+        directory = pending.pop()
+        directories.append(directory)
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                else:
+                    files.append(entry.path)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(os.unlink, files))
+    for directory in reversed(directories):
+        os.rmdir(directory)
+
+def write_file_atomic(path, data, mode=0o644, fsync=False):
+    """
+    Writes data to path via a temporary file in the same directory and os.replace,
+    so readers never see a partially written file. mode (0o600 for private keys)
+    is applied before the rename; fsync is opt-in.
+    """
+    directory = os.path.dirname(path) or '.'
+    with tempfile.NamedTemporaryFile(dir=directory, prefix='.tmp-', delete=False) as tmp_file:
+        try:
+            tmp_file.write(data)
+            tmp_file.flush()
+            if fsync:
+                os.fsync(tmp_file.fileno())
+        except BaseException:
+            tmp_file.close()
+            os.remove(tmp_file.name)
+            raise
+    try:
+        os.chmod(tmp_file.name, mode)
+        os.replace(tmp_file.name, path)
+    except BaseException:
+        os.remove(tmp_file.name)
+        raise
+
+def invalid_filenames(*filenames):
+    """Returns the arguments that are empty or contain a directory component (names are expected, not paths)"""
+    separators = [sep for sep in (os.sep, os.altsep) if sep]
+    return [filename for filename in filenames if not filename or any(sep in filename for sep in separators)]
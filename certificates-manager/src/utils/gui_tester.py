@@ -1,7 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
-import time
 from .performance_tester import PerformanceTest
 from .thingsboard_device import ThingsboardDeviceManager
 
@@ -19,9 +18,16 @@ class PerformanceTestGUI:
         self.create_main_frame()
         
         # Start connection checker
+        self._stop = threading.Event()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.check_connection_thread = threading.Thread(target=self.check_connection_periodically, daemon=True)
         self.check_connection_thread.start()
 
+    def on_close(self):
+        """Stop the connection checker before destroying the window"""
+        self._stop.set()
+        self.root.destroy()
+
     def create_status_frame(self):
         """Create the status indicator frame"""
         status_frame = ttk.Frame(self.root)
@@ -102,12 +108,25 @@ class PerformanceTestGUI:
 
     def check_connection_periodically(self):
         """Periodically check ThingsBoard connection"""
+        tb_manager = ThingsboardDeviceManager()
+        last_state = None
         while True:
-            tb_manager = ThingsboardDeviceManager()
             is_connected = tb_manager.check_connection()
             
-            self.root.after(0, self.update_connection_status, is_connected)
-            time.sleep(5)  # Check every 5 seconds
+            # Only a change needs a Tk round-trip; the indicator already shows an unchanged state
+            if is_connected != last_state:
+                self.root.after(0, self.update_connection_status, is_connected)
+
+            # Recheck soon after a change, every 5s while offline and every 15s while steadily online
+            if is_connected != last_state:
+                delay = 2
+            elif is_connected:
+                delay = 15
+            else:
+                delay = 5
+            last_state = is_connected
+            if self._stop.wait(delay):
+                return
 
     def update_connection_status(self, is_connected):
         """Update the connection status indicator"""
@@ -0,0 +1,3 @@
+# Upper bound on concurrent test iterations, shared by the CLI and the GUI. Iterations run on I/O-bound
+# threads, so this is not tied to the CPU count. Defined here so the GUI can read it without importing paho.
+MAX_WORKERS = 64
@@ -1,5 +1,230 @@
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Any
+import csv
+import importlib.util
+import os
+
+# xlsxwriter streams each sheet straight to the .xlsx and is markedly faster than openpyxl for
+# write-once workbooks; openpyxl (in write-only mode) stays the fallback when xlsxwriter is not installed
+EXCEL_ENGINE = 'xlsxwriter' if importlib.util.find_spec('xlsxwriter') else 'openpyxl'
+
+class PartialResultsWriter:
+    """
+    Appends every iteration's results to a CSV next to the Excel file as soon as they are measured,
+    so a cancelled or failed run keeps what it collected. The file is removed once the Excel export succeeds.
+    """
+    FIELDS = ['config', 'iteration', 'handshake', 'puback', 'total', 'error', 'tls_resumed']
+
+    # Rows are flushed in batches rather than one by one; the GUI runs tests on a daemon thread whose
+    # finally blocks are skipped when the window is closed, so at most this many rows can be lost
+    FLUSH_EVERY = 256
+
+    def __init__(self, excel_filename: str):
+        self.path = f"{os.path.splitext(excel_filename)[0]}.partial.csv"
+        self._file = open(self.path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.FIELDS)
+        self._writer.writeheader()
+        self.flush()
+
+    def write(self, config_name: str, iteration_data: Dict) -> None:
+        """Writes one iteration's results dictionary (as returned by get_results_dict)"""
+        self._writer.writerow({'config': config_name, **iteration_data})
+        self._unflushed += 1
+        if self._unflushed >= self.FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered rows to disk; the test loops also call this after each configuration"""
+        self._file.flush()
+        self._unflushed = 0
+
+    def close(self, keep: bool = True) -> None:
+        """Closes the file; with keep=False it is also deleted"""
+        self._file.close()
+        if not keep:
+            os.remove(self.path)
+
+# Column layout of each configuration's sheet: raw results in A-F, statistics in H-I
+RESULT_COLUMNS = ['iteration', 'handshake', 'puback', 'total', 'error', 'tls_resumed']
+STATS_COLUMN = len(RESULT_COLUMNS) + 1
+
+# Excel rejects (xlsxwriter) or warns about (openpyxl) sheet names longer than this
+MAX_SHEET_NAME = 31
+
+def _sheet_name(config_name: str, used: set) -> str:
+    """Truncates config_name to Excel's sheet name limit, keeping names unique within the workbook"""
+    name = config_name[:MAX_SHEET_NAME]
+    suffix = 1
+    while name in used:
+        suffix += 1
+        name = f"{config_name[:MAX_SHEET_NAME - len(str(suffix)) - 1]}~{suffix}"
+    used.add(name)
+    return name
+
+def _sheet_rows(results_list: List[Dict], stats_rows: List[tuple]):
+    """Yields each worksheet row in order: results on the left, the statistics block from STATS_COLUMN"""
+    header = RESULT_COLUMNS + [None] * (STATS_COLUMN - len(RESULT_COLUMNS)) + ['Metric', 'Value']
+    yield header
+    blank = [None] * STATS_COLUMN
+    for row_index in range(max(len(results_list), len(stats_rows))):
+        if row_index < len(results_list):
+            result = results_list[row_index]
+            row = [result.get(column) for column in RESULT_COLUMNS] + [None] * (STATS_COLUMN - len(RESULT_COLUMNS))
+        else:
+            row = list(blank)
+        if row_index < len(stats_rows):
+            row.extend(stats_rows[row_index])
+        yield row
+
+def _open_workbook(excel_filename: str):
+    """Creates an empty workbook with the fastest available engine; nothing is written until _save_workbook"""
+    if EXCEL_ENGINE == 'xlsxwriter':
+        import xlsxwriter
+        # constant_memory flushes each row to disk as soon as the next one is started
+        return xlsxwriter.Workbook(excel_filename, {'constant_memory': True, 'nan_inf_to_errors': True})
+    from openpyxl import Workbook
+    return Workbook(write_only=True)
+
+def _add_sheet(workbook, sheet_name: str, rows) -> None:
+    """Writes the given rows row by row into a new sheet, without building DataFrames"""
+    if EXCEL_ENGINE == 'xlsxwriter':
+        worksheet = workbook.add_worksheet(sheet_name)
+        for row_index, row in enumerate(rows):
+            worksheet.write_row(row_index, 0, row)
+    else:
+        worksheet = workbook.create_sheet(sheet_name)
+        for row in rows:
+            worksheet.append(row)
+
+def _save_workbook(workbook, excel_filename: str) -> None:
+    if EXCEL_ENGINE == 'xlsxwriter':
+        workbook.close()
+    else:
+        workbook.save(excel_filename)
+
+def _config_statistics(results_list: List[Dict], calculate_statistics):
+    """Returns (stats_rows, summary) for one configuration's results"""
+    # Calculate statistics for all three timings in one pass over an (iterations x 3) array;
+    # None (a failed run) becomes NaN and is skipped
+    timings = np.array([[r['handshake'], r['puback'], r['total']] for r in results_list], dtype=np.float64)
+    column_stats = calculate_statistics(timings)
+    handshake_stats, puback_stats, total_stats = (
+        {name: values[index] for name, values in column_stats.items()} for index in range(3)
+    )
+    # Counted from the error column: with connection reuse only the first iteration has a handshake
+    successful_runs = sum(1 for r in results_list if r.get('error') is None)
+    failed_runs = len(results_list) - successful_runs
+    # Connections that resumed an earlier TLS session (abbreviated handshake); see tls_resumed per row
+    resumed_handshakes = sum(1 for r in results_list if r.get('tls_resumed'))
+
+    # Prepare Stats rows
+    stats_rows = [
+        ('Successful Runs', successful_runs), ('Failed Runs', failed_runs),
+        ('Resumed Handshakes', resumed_handshakes), ('', ''),
+        ('Handshake Mean', handshake_stats['Mean']), ('Handshake Median', handshake_stats['Median']),
+        ('Handshake StdDev', handshake_stats['StdDev']), ('Handshake Min', handshake_stats['Min']),
+        ('Handshake Max', handshake_stats['Max']), ('Handshake 95th %', handshake_stats['95th percentile']), ('', ''),
+        ('PubAck Mean', puback_stats['Mean']), ('PubAck Median', puback_stats['Median']),
+        ('PubAck StdDev', puback_stats['StdDev']), ('PubAck Min', puback_stats['Min']),
+        ('PubAck Max', puback_stats['Max']), ('PubAck 95th %', puback_stats['95th percentile']), ('', ''),
+        ('Total Mean', total_stats['Mean']), ('Total Median', total_stats['Median']),
+        ('Total StdDev', total_stats['StdDev']), ('Total Min', total_stats['Min']),
+        ('Total Max', total_stats['Max']), ('Total 95th %', total_stats['95th percentile']),
+    ]
+
+    summary = {
+        'Handshake Mean': handshake_stats['Mean'],
+        'Handshake Median': handshake_stats['Median'],
+        'Handshake StdDev': handshake_stats['StdDev'],
+        'PubAck Mean': puback_stats['Mean'],
+        'PubAck Median': puback_stats['Median'],
+        'PubAck StdDev': puback_stats['StdDev'],
+        'Total Mean': total_stats['Mean'],
+        'Total Median': total_stats['Median'],
+        'Total StdDev': total_stats['StdDev'],
+        'Successful Runs': successful_runs,
+        'Failed Runs': failed_runs,
+        'Resumed Handshakes': resumed_handshakes
+    }
+    return stats_rows, summary
+
+class ResultsWorkbook:
+    """
+    Writes each configuration's sheet as soon as its iterations are done, so the test loop only has to
+    hold one configuration's results at a time. close() finishes the file and prints the summary.
+    Once a file holds MAX_ROWS_PER_FILE rows, further configurations go to <name>_part2.xlsx, <name>_part3.xlsx, ...
+    so no single workbook grows into the range where the Excel writers slow down; paths lists every file.
+    Errors are reported once and make close() return {}, like export_results_to_excel.
+    """
+    MAX_ROWS_PER_FILE = 250_000
+
+    def __init__(self, excel_filename: str, calculate_statistics):
+        self.excel_filename = excel_filename
+        self.calculate_statistics = calculate_statistics
+        self.summary = {}  # For final console printout
+        self.paths = [excel_filename]
+        self._rows = 0  # Result rows in the current file
+        self._used_sheet_names = set()
+        self._failed = False
+        try:
+            self._workbook = _open_workbook(excel_filename)
+        except Exception as e:
+            self._report_error(e)
+
+    def _report_error(self, e: Exception) -> None:
+        self._failed = True
+        print(f"\nError writing to Excel file: {e}")
+        print("Check if the file is open or if you have write permissions.")
+
+    def _start_next_file(self) -> None:
+        """Saves the current file and continues in the next _partN file"""
+        _save_workbook(self._workbook, self.paths[-1])
+        base, ext = os.path.splitext(self.excel_filename)
+        self.paths.append(f"{base}_part{len(self.paths) + 1}{ext}")
+        self._workbook = _open_workbook(self.paths[-1])
+        self._rows = 0
+        self._used_sheet_names = set()
+
+    def add(self, config_name: str, results_list: List[Dict]) -> None:
+        """Writes the sheet for one configuration's results"""
+        if self._failed:
+            return
+        if not results_list:
+            print(f"No data collected for {config_name}, skipping sheet.")
+            return
+        try:
+            if self._rows and self._rows + len(results_list) > self.MAX_ROWS_PER_FILE:
+                self._start_next_file()
+            stats_rows, summary = _config_statistics(results_list, self.calculate_statistics)
+            sheet_name = _sheet_name(config_name, self._used_sheet_names)
+            _add_sheet(self._workbook, sheet_name, _sheet_rows(results_list, stats_rows))
+        except Exception as e:
+            self._report_error(e)
+            return
+        self._rows += len(results_list)
+        self.summary[config_name] = summary
+        print(f"  Sheet '{sheet_name}' written to '{self.paths[-1]}' with data and statistics.")
+
+    def close(self) -> Dict[str, Dict]:
+        """Saves the workbook and returns the summary statistics for all configurations ({} on failure)"""
+        if self._failed:
+            return {}
+        try:
+            _save_workbook(self._workbook, self.paths[-1])
+        except Exception as e:
+            self._report_error(e)
+            return {}
+        for path in self.paths:
+            print(f"Excel file '{path}' created successfully.")
+
+        # Print summary statistics
+        print("\n\n========= FINAL SUMMARY STATISTICS (CONSOLE) =========")
+        summary_df_console = pd.DataFrame.from_dict(self.summary, orient='index')
+        with pd.option_context('display.float_format', '{:.6f}'.format, 'display.width', 120):
+            print(summary_df_console)
+
+        return self.summary
 
 def export_results_to_excel(all_run_data: Dict[str, List[Dict]], 
                           excel_filename: str,
@@ -16,82 +241,7 @@ def export_results_to_excel(all_run_data: Dict[str, List[Dict]],
         Dictionary containing summary statistics for all configurations
     """
     print(f"\n\n========= Processing Results & Exporting to {excel_filename} =========")
-    all_stats_summary = {}  # For final console printout
-
-    try:
-        with pd.ExcelWriter(excel_filename, engine='openpyxl', mode='w') as writer:
-            for config_name, results_list in all_run_data.items():
-                if not results_list:
-                    print(f"No data collected for {config_name}, skipping sheet.")
-                    continue
-
-                # Convert list of dictionaries to DataFrame
-                df = pd.DataFrame(results_list)
-                df = df[['iteration', 'handshake', 'puback', 'total', 'error']]
-
-                # Calculate statistics
-                handshake_stats = calculate_statistics(df['handshake'].tolist())
-                puback_stats = calculate_statistics(df['puback'].tolist())
-                total_stats = calculate_statistics(df['total'].tolist())
-                successful_runs = handshake_stats['Count']
-                failed_runs = len(df) - successful_runs
-
-                # Prepare Stats DataFrame
-                stats_data = {
-                    'Metric': [
-                        'Successful Runs', 'Failed Runs', '',
-                        'Handshake Mean', 'Handshake Median', 'Handshake StdDev',
-                        'Handshake Min', 'Handshake Max', 'Handshake 95th %', '',
-                        'PubAck Mean', 'PubAck Median', 'PubAck StdDev',
-                        'PubAck Min', 'PubAck Max', 'PubAck 95th %', '',
-                        'Total Mean', 'Total Median', 'Total StdDev',
-                        'Total Min', 'Total Max', 'Total 95th %'
-                    ],
-                    'Value': [
-                        successful_runs, failed_runs, '',
-                        handshake_stats['Mean'], handshake_stats['Median'], handshake_stats['StdDev'],
-                        handshake_stats['Min'], handshake_stats['Max'], handshake_stats['95th percentile'], '',
-                        puback_stats['Mean'], puback_stats['Median'], puback_stats['StdDev'],
-                        puback_stats['Min'], puback_stats['Max'], puback_stats['95th percentile'], '',
-                        total_stats['Mean'], total_stats['Median'], total_stats['StdDev'],
-                        total_stats['Min'], total_stats['Max'], total_stats['95th percentile']
-                    ]
-                }
-                stats_df = pd.DataFrame(stats_data)
-
-                # Write to Excel
-                df.to_excel(writer, sheet_name=config_name, index=False, startrow=0, startcol=0)
-                stats_df.to_excel(writer, sheet_name=config_name, index=False, startrow=0, startcol=6)
-
-                # Store summary statistics
-                all_stats_summary[config_name] = {
-                    'Handshake Mean': handshake_stats['Mean'],
-                    'Handshake Median': handshake_stats['Median'],
-                    'Handshake StdDev': handshake_stats['StdDev'],
-                    'PubAck Mean': puback_stats['Mean'],
-                    'PubAck Median': puback_stats['Median'],
-                    'PubAck StdDev': puback_stats['StdDev'],
-                    'Total Mean': total_stats['Mean'],
-                    'Total Median': total_stats['Median'],
-                    'Total StdDev': total_stats['StdDev'],
-                    'Successful Runs': successful_runs,
-                    'Failed Runs': failed_runs
-                }
-
-                print(f"  Sheet '{config_name}' written with data and statistics.")
-
-        print(f"Excel file '{excel_filename}' created successfully.")
-        
-        # Print summary statistics
-        print("\n\n========= FINAL SUMMARY STATISTICS (CONSOLE) =========")
-        summary_df_console = pd.DataFrame.from_dict(all_stats_summary, orient='index')
-        pd.set_option('display.float_format', '{:.6f}'.format)
-        pd.set_option('display.width', 120)
-        print(summary_df_console)
-
-        return all_stats_summary
-
-    except Exception as e:
-        print(f"\nError writing to Excel file: {e}")
-        print("Check if the file is open or if you have write permissions.")
-        return {}
\ No newline at end of file
+    workbook = ResultsWorkbook(excel_filename, calculate_statistics)
+    for config_name, results_list in all_run_data.items():
+        workbook.add(config_name, results_list)
+    return workbook.close()
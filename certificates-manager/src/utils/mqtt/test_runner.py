@@ -1,4 +1,6 @@
 import paho.mqtt.client as mqtt
+import functools
+import itertools
 import ssl
 import time
 import json
@@ -7,12 +9,13 @@ import numpy as np
 import pandas as pd
 import warnings
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from typing import Dict, Optional
 
-@dataclass
+@dataclass(frozen=True)
 class MqttTestConfig:
-    """Configuration for MQTT test"""
+    """Configuration for MQTT test; frozen, as one instance is shared by every iteration and worker thread"""
     host: str
     port: int
     tls: bool
@@ -24,9 +27,35 @@ class MqttTestConfig:
     username: Optional[str] = None
     password: Optional[str] = None
     payload_size: Optional[int] = 60000
+    resume_tls_session: bool = False  # offer the previous connection's TLS session (abbreviated handshake)
+    run_id: int = 0  # set per test run by build_test_configs, so each run starts without a cached TLS session
+
+# Source of MqttTestConfig.run_id values
+_run_ids = itertools.count(1)
+
+def build_test_configs(cert_dir, ciphers, host="localhost", port=8883, **options):
+    """
+    Builds one MqttTestConfig per cipher, keyed "Test_<cipher>", all using the device1 certificate in cert_dir.
+    Extra keyword options (payload_size, resume_tls_session) are applied to every configuration.
+    All configurations of one call share a new run_id, so their first connects perform full handshakes.
+    """
+    run_id = next(_run_ids)
+    ca_certs = os.path.join(cert_dir, "ca.crt")
+    certfile = os.path.join(cert_dir, "device1.crt")
+    keyfile = os.path.join(cert_dir, "device1.key")
+    return {
+        f"Test_{cipher}": MqttTestConfig(
+            host=host, port=port, tls=True, ca_certs=ca_certs, certfile=certfile, keyfile=keyfile,
+            ciphers=cipher, run_id=run_id, **options
+        )
+        for cipher in ciphers
+    }
 
 warnings.filterwarnings('ignore', category=DeprecationWarning)
 
+# Timestamps are integer nanoseconds from time.perf_counter_ns(); durations are converted to seconds only when reported
+NS_PER_SECOND = 1_000_000_000
+
 # --- Test State Class ---
 class MqttTestState:
     """Holds state and timing data for a single MQTT test run."""
@@ -41,19 +70,20 @@ class MqttTestState:
         self.connect_event = threading.Event()
         self.publish_event = threading.Event()
         self.message_id = None
+        self.tls_resumed = None # Whether the server accepted the offered TLS session; None if unknown
 
     def record_connect_sent(self):
-        self.connect_sent_time = time.perf_counter() # Use high-resolution timer
+        self.connect_sent_time = time.perf_counter_ns() # Use high-resolution timer
 
     def record_connect_ack(self):
-        self.connect_ack_time = time.perf_counter()
+        self.connect_ack_time = time.perf_counter_ns()
         self.connect_event.set() # Signal that connection is complete
 
     def record_publish_sent(self):
-        self.publish_sent_time = time.perf_counter()
+        self.publish_sent_time = time.perf_counter_ns()
 
     def record_publish_ack(self):
-        self.publish_ack_time = time.perf_counter()
+        self.publish_ack_time = time.perf_counter_ns()
         self.publish_event.set() # Signal that publish is acknowledged
 
     def record_error(self, err_msg):
@@ -73,7 +103,8 @@ class MqttTestState:
                 "handshake": None,
                 "puback": None,
                 "total": None,
-                "error": self.error
+                "error": self.error,
+                "tls_resumed": self.tls_resumed
             }
         # Check if all necessary timestamps were recorded
         # Allow calculation even if publish failed, handshake might be valid
@@ -83,10 +114,10 @@ class MqttTestState:
         final_error = None
 
         if self.connect_sent_time > 0 and self.connect_ack_time > 0:
-             handshake_time = self.connect_ack_time - self.connect_sent_time
+             handshake_time = (self.connect_ack_time - self.connect_sent_time) / NS_PER_SECOND
              if self.publish_sent_time > 0 and self.publish_ack_time > 0:
-                  puback_time = self.publish_ack_time - self.publish_sent_time
-                  total_time = self.publish_ack_time - self.connect_sent_time
+                  puback_time = (self.publish_ack_time - self.publish_sent_time) / NS_PER_SECOND
+                  total_time = (self.publish_ack_time - self.connect_sent_time) / NS_PER_SECOND
              elif self.publish_sent_time > 0: # Publish started but didn't finish
                  final_error = self.error if self.error else "PUBACK Incomplete/Timeout"
              else: # Connect finished but publish didn't start (e.g. error before publish)
@@ -111,7 +142,8 @@ class MqttTestState:
             "handshake": handshake_time,
             "puback": puback_time,
             "total": total_time,
-            "error": final_error
+            "error": final_error,
+            "tls_resumed": self.tls_resumed
         }
 
 # --- MQTT Callbacks ---
@@ -141,12 +173,12 @@ def on_disconnect(client, userdata, reason_code, properties=None):
     # Can be useful for debugging unexpected disconnects
     if reason_code != 0 and not state.error:
          # Only log if it wasn't an expected disconnect or already errored
-        current_time = time.perf_counter()
+        current_time = time.perf_counter_ns()
         # Check if disconnect happened after expected completion
         disconnect_error = True
-        if state.publish_ack_time > 0 and current_time - state.publish_ack_time < 1.0: # Allow 1s for clean disconnect
+        if state.publish_ack_time > 0 and current_time - state.publish_ack_time < NS_PER_SECOND: # Allow 1s for clean disconnect
              disconnect_error = False
-        elif state.connect_ack_time > 0 and state.publish_sent_time == 0 and current_time - state.connect_ack_time < 1.0: # If publish never started
+        elif state.connect_ack_time > 0 and state.publish_sent_time == 0 and current_time - state.connect_ack_time < NS_PER_SECOND: # If publish never started
              disconnect_error = False
 
 
@@ -166,11 +198,70 @@ def on_publish(client, userdata, mid):
     #     print(f"Iter {state.iteration} ({state.config_name}): Received PUBACK for unexpected mid {mid}")
 
 
-# --- Test Execution Function ---
-def run_mqtt_test(iteration, config_name, client_config):
-    """Runs a single connect, publish, disconnect test."""
-
-    state = MqttTestState(iteration, config_name)
+# --- Test Execution Functions ---
+class _SessionResumingContext(ssl.SSLContext):
+    """SSLContext that offers the last recorded client session on every new connection"""
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.session = None
+        self._session_lock = threading.Lock()
+
+    def record_session(self, session):
+        """Stores the session to offer next; called from concurrent worker threads"""
+        with self._session_lock:
+            self.session = session
+
+    def wrap_socket(self, sock, *args, **kwargs):
+        with self._session_lock:
+            session = self.session
+        if session is not None:
+            kwargs.setdefault('session', session)
+        return super().wrap_socket(sock, *args, **kwargs)
+
+def _tls_context(ca_certs, certfile, keyfile, ciphers, resume_session=False, run_id=0):
+    """
+    Returns the client SSLContext for a certificate/cipher combination, built once with the same settings
+    client.tls_set used, so iterations no longer re-read and re-parse the PEM files. The files' mtimes are
+    part of the cache key, so certificates regenerated into the same directory are picked up.
+    Client sessions are only resumed with resume_session; otherwise every connect performs a full handshake.
+    Each run_id gets its own contexts, so a run never resumes a session left over from an earlier run.
+    """
+    mtimes = tuple(os.stat(path).st_mtime_ns for path in (ca_certs, certfile, keyfile))
+    return _build_tls_context(ca_certs, certfile, keyfile, ciphers, resume_session, run_id, mtimes)
+
+@functools.lru_cache(maxsize=16)
+def _build_tls_context(ca_certs, certfile, keyfile, ciphers, resume_session, run_id, mtimes):
+    """Builds the SSLContext for _tls_context; run_id and mtimes are only part of the cache key."""
+    context = (_SessionResumingContext if resume_session else ssl.SSLContext)(ssl.PROTOCOL_TLSv1_2)
+    # Nothing here renegotiates or compresses; OP_NO_COMPRESSION is already a default, stated for clarity
+    context.options |= ssl.OP_NO_COMPRESSION | getattr(ssl, 'OP_NO_RENEGOTIATION', 0)
+    context.load_cert_chain(certfile, keyfile)
+    context.verify_mode = ssl.CERT_REQUIRED
+    context.check_hostname = True
+    context.load_verify_locations(ca_certs)
+    if ciphers:
+        context.set_ciphers(ciphers)
+    return context
+
+def _wait_for(client, event, timeout, background_loop):
+    """
+    Waits up to timeout seconds for event. Without a background network thread the client's
+    network loop is driven from this thread meanwhile; loop() returns as soon as data arrives.
+    """
+    if background_loop:
+        return event.wait(timeout=timeout)
+    deadline = time.perf_counter() + timeout
+    while not event.is_set() and time.perf_counter() < deadline:
+        if client.loop(timeout=0.1) != mqtt.MQTT_ERR_SUCCESS:
+            break # Connection lost; on_disconnect has recorded why
+    return event.is_set()
+
+def _connect_client(state, config_name, iteration, client_config, background_loop=False):
+    """
+    Creates a client, applies TLS/auth and connects. Returns (client, connected); client is None if setup failed.
+    With background_loop, paho's network thread is started (needed for long-lived connections that must
+    answer keepalives while idle); otherwise the caller's thread drives the network loop while it waits.
+    """
     # Create a new client instance for each iteration to avoid client-side caching
     client = mqtt.Client(
         client_id=client_config.get("clientId", f"perf-tester-{config_name}-{iteration}-{time.time_ns()}"),
@@ -185,29 +276,30 @@ def run_mqtt_test(iteration, config_name, client_config):
     
 
     # Apply configuration
+    context = None
     if client_config.get("tls", False):
         try:
-            client.tls_set(
-                ca_certs=client_config.get("ca_certs"),
-                certfile=client_config.get("certfile"),
-                keyfile=client_config.get("keyfile"),
-                cert_reqs=ssl.CERT_REQUIRED,
-                # tls_version=ssl.PROTOCOL_TLS_CLIENT,  # This is the default
-                tls_version=ssl.PROTOCOL_TLSv1_2,  # This is the default
-                ciphers=client_config.get("ciphers"), # Pass None to negotiate
+            context = _tls_context(
+                client_config.get("ca_certs"),
+                client_config.get("certfile"),
+                client_config.get("keyfile"),
+                client_config.get("ciphers"), # Pass None to negotiate
+                client_config.get("resume_tls_session", False),
+                client_config.get("run_id", 0),
             )
+            client.tls_set_context(context)
 
         except ValueError as e:
              # Catch potential errors from set_ciphers if suite is invalid/unsupported
              error_msg = f"Iter {state.iteration} ({state.config_name}): TLS Setup Error (Invalid Cipher?): {e}"
              print(error_msg)
              state.record_error(error_msg)
-             return state
+             return None, False
         except Exception as e:
             error_msg = f"Iter {state.iteration} ({state.config_name}): TLS Setup Error: {e}"
             print(error_msg)
             state.record_error(error_msg)
-            return state # Return early if TLS setup fails
+            return None, False # Return early if TLS setup fails
 
     if client_config.get("username"):
         client.username_pw_set(client_config["username"], client_config.get("password"))
@@ -220,19 +312,21 @@ def run_mqtt_test(iteration, config_name, client_config):
             client_config["port"],
             keepalive=60
         )
-        client.loop_start() # Start network loop in background thread
+        if background_loop:
+            client.loop_start() # Start network loop in background thread
     except Exception as e:
         error_msg = f"Iter {state.iteration} ({state.config_name}): Connect Error: {e}"
         print(error_msg)
         state.record_error(error_msg)
         # Ensure loop stops if connect fails immediately
-        try:
-             client.loop_stop(force=True) # Force stop if connect threw exception
-        except: pass # Ignore errors during cleanup on failure
-        return state # Return early
+        if background_loop:
+            try:
+                 client.loop_stop(force=True) # Force stop if connect threw exception
+            except: pass # Ignore errors during cleanup on failure
+        return None, False # Return early
 
     # Wait for connection to complete (or fail)
-    connected = state.connect_event.wait(timeout=15) # Increased timeout slightly
+    connected = _wait_for(client, state.connect_event, 15, background_loop) # Increased timeout slightly
 
     if not connected and not state.error:
         state.record_error("Connect timeout")
@@ -241,88 +335,234 @@ def run_mqtt_test(iteration, config_name, client_config):
     elif state.error and state.connect_sent_time > 0 and state.connect_ack_time == 0:
          print(f"Iter {state.iteration} ({state.config_name}): Connect failed: {state.error}")
 
+    ssl_socket = client.socket() if connected and context is not None else None
+    if isinstance(ssl_socket, ssl.SSLSocket):
+        state.tls_resumed = ssl_socket.session_reused
+        if isinstance(context, _SessionResumingContext):
+            # Outside the timed window; the next connect with this context offers this session
+            context.record_session(ssl_socket.session)
+
+    return client, connected
+
+@functools.lru_cache(maxsize=8)
+def _payload(payload_size):
+    """Encoded telemetry message for a payload size, built once; paho publishes bytes without another copy."""
+    message_content = {
+        "data": "X" * payload_size,
+        "status": "Testing large payload"
+    }
+    payload = json.dumps(message_content).encode('ascii')
+    print(f"  Payload size: {len(payload)} bytes")
+    return payload
 
-    # --- Publish Phase (only if connected successfully) ---
-    if connected and not state.error:
-        try:
-            payload_size = client_config.get("payload_size", 60000)  # Default to 60KB if not specified
-            large_string = "X" * payload_size
-            message_content = {
-                "data": large_string,
-                "status": "Testing large payload"
-            }
-            payload = json.dumps(message_content)
-            print(f"  Payload size: {len(payload)} bytes") # Optional: print size
-
-            state.record_publish_sent()
-            msg_info = client.publish(
-                topic="v1/devices/me/telemetry",
-                payload=payload,
-                qos=1
-            )
-            if msg_info.rc != mqtt.MQTT_ERR_SUCCESS:
-                 raise Exception(f"Publish failed with rc: {msg_info.rc}")
+def _config_payload(client_config):
+    """Payload for a configuration; callers fetch it before connecting, outside the timed connect-to-PUBACK window."""
+    return _payload(client_config.get("payload_size", 60000))  # Default to 60KB if not specified
 
-            state.message_id = msg_info.mid # Store the message ID we are waiting for
-            # print(f"Iter {state.iteration} ({state.config_name}): Publishing mid {state.message_id}")
+def _publish_and_wait(client, state, payload, background_loop=False):
+    """Publishes one QoS 1 message with the given payload and waits for its PUBACK."""
+    try:
+        state.record_publish_sent()
+        msg_info = client.publish(
+            topic="v1/devices/me/telemetry",
+            payload=payload,
+            qos=1
+        )
+        if msg_info.rc != mqtt.MQTT_ERR_SUCCESS:
+             raise Exception(f"Publish failed with rc: {msg_info.rc}")
 
-            # Wait for PUBACK via on_publish callback
-            puback_received = state.publish_event.wait(timeout=15) # Increased timeout slightly
+        state.message_id = msg_info.mid # Store the message ID we are waiting for
+        # print(f"Iter {state.iteration} ({state.config_name}): Publishing mid {state.message_id}")
 
-            if not puback_received and not state.error:
-                 # Check if publish_ack_time was set by the callback just before timeout
-                 if state.publish_ack_time == 0:
-                      state.record_error("PUBACK timeout")
-                      print(f"Iter {state.iteration} ({state.config_name}): PUBACK Timeout!")
+        # Wait for PUBACK via on_publish callback
+        puback_received = _wait_for(client, state.publish_event, 15, background_loop) # Increased timeout slightly
 
-        except Exception as e:
-            error_msg = f"Iter {state.iteration} ({state.config_name}): Publish Error: {e}"
-            print(error_msg)
-            # Avoid overwriting a more specific error if one was already set
-            if not state.error:
-                state.record_error(error_msg)
+        if not puback_received and not state.error:
+             # Check if publish_ack_time was set by the callback just before timeout
+             if state.publish_ack_time == 0:
+                  state.record_error("PUBACK timeout")
+                  print(f"Iter {state.iteration} ({state.config_name}): PUBACK Timeout!")
 
-    # --- Disconnect Phase ---
-    # Ensure disconnect happens even if publish failed, but only if connect was attempted
-    if state.connect_sent_time > 0:
-        try:
-            # print(f"Iter {state.iteration} ({state.config_name}): Disconnecting...")
-            client.disconnect()
+    except Exception as e:
+        error_msg = f"Iter {state.iteration} ({state.config_name}): Publish Error: {e}"
+        print(error_msg)
+        # Avoid overwriting a more specific error if one was already set
+        if not state.error:
+            state.record_error(error_msg)
+
+def _disconnect_client(client, state, background_loop=False):
+    """Disconnects and stops the client's network loop, logging but not recording errors."""
+    try:
+        # print(f"Iter {state.iteration} ({state.config_name}): Disconnecting...")
+        client.disconnect()
+        if background_loop:
             # Give a brief moment for disconnect packet to send before stopping loop
             time.sleep(0.1)
-        except Exception as e:
-            # Log disconnect error but don't overwrite primary error
-            print(f"Iter {state.iteration} ({state.config_name}): Disconnect Error: {e}")
-        finally:
-             # Always try to stop the network loop
+        else:
+            # Flush the DISCONNECT packet from this thread; returns once the socket is closed
+            client.loop(timeout=0.1)
+    except Exception as e:
+        # Log disconnect error but don't overwrite primary error
+        print(f"Iter {state.iteration} ({state.config_name}): Disconnect Error: {e}")
+    finally:
+         # Always try to stop the network loop
+         if background_loop:
              try:
                   client.loop_stop()
              except:
                   pass # Ignore errors during final cleanup
 
+def run_mqtt_test(iteration, config_name, client_config):
+    """Runs a single connect, publish, disconnect test."""
+
+    payload = _config_payload(client_config)
+    state = MqttTestState(iteration, config_name)
+    client, connected = _connect_client(state, config_name, iteration, client_config)
+    if client is None:
+        return state
+
+    # --- Publish Phase (only if connected successfully) ---
+    if connected and not state.error:
+        _publish_and_wait(client, state, payload)
+
+    # --- Disconnect Phase ---
+    # Ensure disconnect happens even if publish failed, but only if connect was attempted
+    if state.connect_sent_time > 0:
+        _disconnect_client(client, state)
 
     return state
 
+def run_mqtt_test_reused(config_name, client_config, iterations):
+    """
+    Generator that connects once and then publishes one message per iteration on the same connection,
+    yielding each iteration's results dictionary. Only the first iteration carries a handshake time,
+    so puback times measure the steady state. Closing the generator (e.g. on cancel) disconnects.
+    A failed connect yields a single failed iteration.
+    """
+    payload = _config_payload(client_config)
+    state = MqttTestState(1, config_name)
+    client, connected = _connect_client(state, config_name, 1, client_config, background_loop=True)
+    if client is None or not connected or state.error:
+        if client is not None and state.connect_sent_time > 0:
+            _disconnect_client(client, state, background_loop=True)
+        yield state.get_results_dict()
+        return
+
+    try:
+        for i in range(1, iterations + 1):
+            if i > 1:
+                # Fresh state for this publish; it was never (re)connected, so only PUBACK timing applies
+                state = MqttTestState(i, config_name)
+                client.user_data_set(state)
+            _publish_and_wait(client, state, payload, background_loop=True)
+            if i == 1:
+                yield state.get_results_dict()
+            else:
+                yield _reused_results_dict(state)
+    finally:
+        _disconnect_client(client, state, background_loop=True)
+
+def _reused_results_dict(state):
+    """Results for an iteration that published on an already-open connection (no handshake)."""
+    puback_time = None
+    if state.publish_sent_time > 0 and state.publish_ack_time > 0:
+        puback_time = (state.publish_ack_time - state.publish_sent_time) / NS_PER_SECOND
+    return {
+        "iteration": state.iteration,
+        "handshake": None,
+        "puback": puback_time,
+        "total": puback_time,
+        "error": state.error if state.error or puback_time is not None else "PUBACK Incomplete/Timeout",
+        "tls_resumed": None
+    }
+
+def run_mqtt_test_results(iteration, config_name, client_config):
+    """Runs one test iteration and returns its results dictionary."""
+    return run_mqtt_test(iteration, config_name, client_config).get_results_dict()
+
+def run_mqtt_tests_concurrently(client_configs, iterations, workers):
+    """
+    Generator that runs every (configuration, iteration) pair on a pool of `workers` threads; paho's socket
+    I/O and the TLS handshake release the GIL. Yields (config_name, results dictionary) in completion order.
+    Each iteration still uses its own client, so handshake timings stay per connection.
+    Closing the generator (e.g. on cancel) drops the iterations that have not started yet.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            executor.submit(run_mqtt_test_results, i, config_name, client_config): config_name
+            for config_name, client_config in client_configs.items()
+            for i in range(1, iterations + 1)
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def wait_for_next_iteration(next_start, delay):
+    """
+    Sleeps until next_start (a time.perf_counter() value) and returns when the following iteration is due.
+    Iterations are scheduled delay seconds apart from an absolute start, so sleep overshoot does not
+    accumulate; an iteration that overran its slot starts the schedule afresh rather than bursting to catch up.
+    """
+    now = time.perf_counter()
+    if next_start > now:
+        time.sleep(next_start - now)
+        return next_start + delay
+    return now + delay
+
 # --- Statistics Function ---
 def calculate_statistics(data_list):
-    """Calculates statistics for a list of timings, returns a dictionary."""
-    # Filter out None values which indicate errors or incomplete runs
-    valid_data = [d for d in data_list if d is not None and isinstance(d, (int, float))]
+    """
+    Calculates statistics for a list or array of timings, returns a dictionary.
+    None/NaN entries (errors or incomplete runs) are ignored.
+    A 2D array (one column per metric) is reduced column by column in a single pass;
+    each statistic is then a list with one value per column (None where a column has no valid data).
+    """
+    try:
+        # One vectorized conversion; None becomes NaN (as in a pandas float column)
+        data = np.asarray(data_list, dtype=np.float64)
+    except (TypeError, ValueError):
+        data = np.array([d for d in data_list if isinstance(d, (int, float))], dtype=np.float64)
+    if data.ndim == 2:
+        return _column_statistics(data)
+    data = data[~np.isnan(data)]
     stats = {
         'Mean': None, 'Median': None, 'StdDev': None,
         'Min': None, 'Max': None, '95th percentile': None,
-        'Count': len(valid_data)
+        'Count': len(data)
     }
-    if not valid_data:
+    if not len(data):
         return stats
 
-    data = np.array(valid_data)
     stats['Mean'] = np.mean(data)
-    stats['Median'] = np.median(data)
     stats['StdDev'] = np.std(data)
     stats['Min'] = np.min(data)
     stats['Max'] = np.max(data)
-    stats['95th percentile'] = np.percentile(data, 95)
+    # Both percentiles from a single partition of the data
+    stats['Median'], stats['95th percentile'] = np.percentile(data, [50, 95])
+    return stats
+
+def _column_statistics(data):
+    """calculate_statistics for a 2D array: NaN-aware reductions over axis 0"""
+    counts = np.sum(~np.isnan(data), axis=0)
+    with warnings.catch_warnings():
+        # All-NaN columns (e.g. no successful run) produce NaN here and None below
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median, percentile_95 = np.nanpercentile(data, [50, 95], axis=0)
+        columns = {
+            'Mean': np.nanmean(data, axis=0),
+            'Median': median,
+            'StdDev': np.nanstd(data, axis=0),
+            'Min': np.nanmin(data, axis=0),
+            'Max': np.nanmax(data, axis=0),
+            '95th percentile': percentile_95,
+        }
+    stats = {
+        name: [float(value) if count else None for value, count in zip(values, counts)]
+        for name, values in columns.items()
+    }
+    stats['Count'] = [int(count) for count in counts]
     return stats
 
 
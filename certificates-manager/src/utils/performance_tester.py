@@ -1,11 +1,11 @@
-import paho.mqtt.client as mqtt
-import ssl
 import time
-import json
-import os
 from typing import Dict, List, Optional
 from ..utils.user_input import get_user_choice
 from ..utils.thingsboard_device import ThingsboardDeviceManager
+from ..utils.file_utils import list_subdirectories, find_missing_files
+from .mqtt.test_runner import run_mqtt_test, run_mqtt_tests_concurrently, wait_for_next_iteration, calculate_statistics, build_test_configs
+from .mqtt.excel_handler import PartialResultsWriter, ResultsWorkbook
+from .mqtt import MAX_WORKERS
 
 class PerformanceTest:
     AVAILABLE_CIPHERS = {
@@ -29,6 +29,9 @@ class PerformanceTest:
         self.cert_dir = None
         self.iterations = 1
         self.delay = 2
+        self.workers = 1  # >1 runs iterations concurrently on worker threads (delay is then ignored)
+        self.reuse_connection = False  # publish every iteration on one connection per cipher
+        self.resume_tls_session = False  # offer the previous TLS session on each new connection
         self.selected_ciphers = []
         self.output_file = "performance_results.xlsx"
 
@@ -36,15 +39,16 @@ class PerformanceTest:
         """Configure test parameters"""
         print("\n=== Performance Test Setup ===")
 
-        # 1. Check ThingsBoard connection
+        # 1. Check ThingsBoard is up. The test itself only talks MQTT, so a TCP probe is enough here;
+        # a full check_connection would log in (password hashing on the server) just to be thrown away
         tb_manager = ThingsboardDeviceManager()
-        if not tb_manager.check_connection():
-            print("ThingsBoard must be running to perform tests.")
+        if not tb_manager.tcp_ping():
+            print(f"ThingsBoard must be running to perform tests (nothing is listening at {tb_manager.base_url}).")
             return False
 
         # 2. Select certificate directory
         print("\nLooking for certificate directories...")
-        cert_dirs = [d for d in os.listdir('.') if os.path.isdir(d)]
+        cert_dirs = list_subdirectories('.')
         if not cert_dirs:
             print("No certificate directories found.")
             return False
@@ -55,10 +59,9 @@ class PerformanceTest:
 
         # 3. Verify required files
         required_files = ["ca.crt", "device1.crt", "device1.key"]
-        for file in required_files:
-            if not os.path.exists(os.path.join(self.cert_dir, file)):
-                print(f"Missing required file: {file}")
-                return False
+        for file in find_missing_files(self.cert_dir, required_files):
+            print(f"Missing required file: {file}")
+            return False
 
         # 4. Get test parameters
         iterations = get_user_choice(
@@ -87,10 +90,32 @@ class PerformanceTest:
             print("Invalid delay. Using default: 2")
             self.delay = 2
 
+        workers = get_user_choice(
+            f"\nEnter number of concurrent iterations (1-{MAX_WORKERS}, 1 = sequential, default 1):", 
+            [], 
+            allow_manual_entry=True
+        )
+        try:
+            self.workers = int(workers) if workers else 1
+            if not 1 <= self.workers <= MAX_WORKERS:
+                raise ValueError
+        except ValueError:
+            print("Invalid worker count. Using default: 1")
+            self.workers = 1
+
+        resume = get_user_choice(
+            "\nResume TLS sessions between iterations? Handshakes after the first are abbreviated (y/N):", 
+            [], 
+            allow_manual_entry=True
+        )
+        self.resume_tls_session = resume.lower() in ('y', 'yes')
+
         # 5. Select ciphers to test
+        # Numbered in this order for both the listing and the selection
+        cipher_list = list(self.AVAILABLE_CIPHERS)
         print("\nAvailable cipher suites:")
-        for i, (cipher, description) in enumerate(self.AVAILABLE_CIPHERS.items(), 1):
-            print(f"{i}. {cipher} ({description})")
+        for i, cipher in enumerate(cipher_list, 1):
+            print(f"{i}. {cipher} ({self.AVAILABLE_CIPHERS[cipher]})")
 
         while True:
             cipher_choice = get_user_choice(
@@ -99,11 +124,14 @@ class PerformanceTest:
                 allow_manual_entry=True
             )
             if cipher_choice.lower() == 'all':
-                self.selected_ciphers = list(self.AVAILABLE_CIPHERS.keys())
+                self.selected_ciphers = cipher_list
                 break
             try:
                 choices = [int(x.strip()) for x in cipher_choice.split(',')]
-                self.selected_ciphers = [list(self.AVAILABLE_CIPHERS.keys())[i-1] for i in choices]
+                # Reject 0 and negative numbers too, which plain indexing would silently wrap around
+                if any(not 1 <= i <= len(cipher_list) for i in choices):
+                    raise IndexError
+                self.selected_ciphers = [cipher_list[i-1] for i in choices]
                 break
             except (ValueError, IndexError):
                 print("Invalid selection. Try again or type 'all'")
@@ -121,6 +149,7 @@ class PerformanceTest:
         print(f"Certificates directory: {self.cert_dir}")
         print(f"Iterations: {self.iterations}")
         print(f"Delay: {self.delay} seconds")
+        print(f"Concurrent iterations: {self.workers}")
         print(f"Selected ciphers: {len(self.selected_ciphers)}")
         print(f"Output file: {self.output_file}")
 
@@ -128,52 +157,55 @@ class PerformanceTest:
 
     def run_test(self) -> None:
         """Execute the performance test"""
-        from .mqtt.test_runner import run_mqtt_test, calculate_statistics, MqttTestConfig
-        from .mqtt.excel_handler import export_results_to_excel
-
-        all_run_data = {}
-
-        # Create test configurations
-        test_configs = {}
-        for cipher in self.selected_ciphers:
-            config_name = f"Test_{cipher}"
-            config = MqttTestConfig(
-                host="localhost",
-                port=8883,
-                tls=True,
-                ca_certs=os.path.join(self.cert_dir, "ca.crt"),
-                certfile=os.path.join(self.cert_dir, "device1.crt"),
-                keyfile=os.path.join(self.cert_dir, "device1.key"),
-                ciphers=cipher
-            )
-            test_configs[config_name] = config
-
-        # Run tests for each configuration
-        for config_name, config in test_configs.items():
-            print(f"\n===== Starting Test: {config_name} =====")
-            iteration_results = []
-
-            for i in range(1, self.iterations + 1):
-                print(f"--- Iteration {i}/{self.iterations} ---")
-                run_state = run_mqtt_test(i, config_name, config.__dict__)
-                iteration_data = run_state.get_results_dict()
-                iteration_results.append(iteration_data)
-
-                if iteration_data.get("error"):
-                    print(f"  Iteration {i} failed: {iteration_data['error']}")
-                else:
-                    print(f"  Iteration {i} completed successfully")
-
-                if self.delay > 0 and i < self.iterations:
-                    time.sleep(self.delay)
-
-            all_run_data[config_name] = iteration_results
-
-        # Export results
-        export_results_to_excel(
-            all_run_data=all_run_data,
-            excel_filename=self.output_file,
-            calculate_statistics=calculate_statistics
-        )
+        test_configs = build_test_configs(self.cert_dir, self.selected_ciphers, resume_tls_session=self.resume_tls_session)
 
-        print(f"\nPerformance test complete! Results saved to: {self.output_file}")
\ No newline at end of file
+        # Each iteration is also appended to a CSV right away, so an interrupted run keeps its results
+        partial_results = PartialResultsWriter(self.output_file)
+        exported = False
+        # Each configuration's sheet is written as soon as all of its iterations are done
+        results_workbook = ResultsWorkbook(self.output_file, calculate_statistics)
+        try:
+            if self.workers > 1:
+                # Independent iterations on worker threads; results are put back in iteration order
+                print(f"\n===== Running {len(test_configs)} test(s) with {self.workers} concurrent iterations =====")
+                all_run_data = {config_name: [None] * self.iterations for config_name in test_configs}
+                client_configs = {config_name: config.__dict__ for config_name, config in test_configs.items()}
+                for config_name, iteration_data in run_mqtt_tests_concurrently(client_configs, self.iterations, self.workers):
+                    all_run_data[config_name][iteration_data['iteration'] - 1] = iteration_data
+                    partial_results.write(config_name, iteration_data)
+                    status = f"failed: {iteration_data['error']}" if iteration_data.get("error") else "completed successfully"
+                    print(f"  {config_name} iteration {iteration_data['iteration']} {status}")
+                for config_name, iteration_results in all_run_data.items():
+                    results_workbook.add(config_name, iteration_results)
+            else:
+                # Run tests for each configuration
+                for config_name, config in test_configs.items():
+                    print(f"\n===== Starting Test: {config_name} =====")
+                    iteration_results = []
+                    client_config = config.__dict__  # same dict for every iteration of this cipher
+                    next_start = time.perf_counter()
+
+                    for i in range(1, self.iterations + 1):
+                        next_start = wait_for_next_iteration(next_start, self.delay)
+                        print(f"--- Iteration {i}/{self.iterations} ---")
+                        run_state = run_mqtt_test(i, config_name, client_config)
+                        iteration_data = run_state.get_results_dict()
+                        iteration_results.append(iteration_data)
+                        partial_results.write(config_name, iteration_data)
+
+                        if iteration_data.get("error"):
+                            print(f"  Iteration {i} failed: {iteration_data['error']}")
+                        else:
+                            print(f"  Iteration {i} completed successfully")
+
+                    partial_results.flush()
+                    results_workbook.add(config_name, iteration_results)
+
+            # The CSV is only dropped if the workbook was actually written (close reports errors with {})
+            exported = bool(results_workbook.close())
+        finally:
+            partial_results.close(keep=not exported)
+            if not exported:
+                print(f"Partial results saved to: {partial_results.path}")
+
+        print(f"\nPerformance test complete! Results saved to: {', '.join(results_workbook.paths)}")
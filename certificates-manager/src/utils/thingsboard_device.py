@@ -1,16 +1,43 @@
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+import base64
 import json
+import logging
 import os
+import socket
+import time
 from typing import Optional
 
+_log = logging.getLogger(__name__)
+
+# Tokens are renewed this many seconds before their 'exp' claim, so a request never races the expiry
+TOKEN_EXPIRY_MARGIN = 60
+
+# Connections kept per host; matches the default worker count of provision_devices so its threads never wait on the pool
+POOL_SIZE = 8
+
 class ThingsboardDeviceManager:
     def __init__(self, host: str = "localhost", port: int = 8081):  # Updated port to 8081
+        self.host = host
+        self.port = port
         self.base_url = f"http://{host}:{port}/api"
         self.auth_token = None
-        self.headers = {
+        self.token_expires_at = None
+        # One keep-alive connection pool per manager, so repeated calls skip the TCP (and TLS) setup
+        self._session = requests.Session()
+        self._session.headers.update({
             "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+            "Accept": "application/json",
+            "Connection": "keep-alive"
+        })
+        # The session's own headers, so the token set by login() goes out with every later request
+        self.headers = self._session.headers
+        # PEM contents by (path, mtime, size), so repeated provisioning calls do not re-read the same certificate
+        self._cert_cache = {}
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
 
     def login(self, username: str = "tenant@thingsboard.org", password: str = "tenant") -> bool:
         """Login to ThingsBoard and get JWT token"""
@@ -18,43 +45,77 @@ class ThingsboardDeviceManager:
         credentials = {"username": username, "password": password}
         
         try:
-            response = requests.post(login_url, json=credentials)
+            response = self._session.post(login_url, json=credentials)
             if response.status_code == 401:
-                print("Authentication failed. Please check your credentials.")
-                print(f"Response: {response.text}")
+                _log.error("Authentication failed. Please check your credentials.")
+                _log.error(f"Response: {response.text}")
                 return False
                 
             response.raise_for_status()
             self.auth_token = response.json()['token']
+            self.token_expires_at = self._token_expiry(self.auth_token)
             self.headers["X-Authorization"] = f"Bearer {self.auth_token}"
-            print("Successfully logged in to ThingsBoard")
+            _log.info("Successfully logged in to ThingsBoard")
             return True
             
         except requests.exceptions.ConnectionError:
-            print(f"Failed to connect to ThingsBoard server at {self.base_url}")
-            print("Please ensure the server is running and the port is correct")
+            _log.error(f"Failed to connect to ThingsBoard server at {self.base_url}")
+            _log.error("Please ensure the server is running and the port is correct")
             return False
         except requests.exceptions.RequestException as e:
-            print(f"Login failed: {str(e)}")
+            _log.error(f"Login failed: {str(e)}")
             if hasattr(e, 'response') and e.response is not None:
-                print(f"Response: {e.response.text}")
+                _log.error(f"Response: {e.response.text}")
             return False
 
+    @staticmethod
+    def _token_expiry(token: str) -> Optional[float]:
+        """Reads the 'exp' claim (epoch seconds) from a JWT payload; None if it cannot be decoded"""
+        try:
+            payload = token.split('.')[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            return float(claims['exp'])
+        except (IndexError, KeyError, TypeError, ValueError):
+            return None
+
+    @property
+    def is_authenticated(self) -> bool:
+        """True while a token is held that is not about to expire"""
+        if not self.auth_token:
+            return False
+        return self.token_expires_at is None or time.time() < self.token_expires_at - TOKEN_EXPIRY_MARGIN
+
+    def ensure_login(self) -> bool:
+        """Logs in only if there is no valid token yet, so a shared manager re-authenticates transparently"""
+        return self.is_authenticated or self.login()
+
+    def _read_cert(self, cert_path: str) -> Optional[str]:
+        """Returns the stripped PEM text of cert_path, from memory while the file is unchanged; None if unreadable"""
+        try:
+            st = os.stat(cert_path)
+            key = (os.path.abspath(cert_path), st.st_mtime_ns, st.st_size)
+            if key not in self._cert_cache:
+                with open(cert_path, 'r') as cert_file:
+                    self._cert_cache[key] = cert_file.read().strip()
+            return self._cert_cache[key]
+        except FileNotFoundError:
+            _log.error(f"Certificate file not found: {cert_path}")
+        except Exception as e:
+            _log.error(f"Failed to read certificate file: {str(e)}")
+        return None
+
     def create_profile_with_certificate(self, profile_name, cert_path: str) -> any:
         """Create a device profile and assign X.509 certificate credentials"""
         if not self.auth_token:
-            print("Not logged in. Please login first.")
+            _log.error("Not logged in. Please login first.")
             return False
 
         try:
             # 1. Read certificate content
-            if not os.path.exists(cert_path):
-                print(f"Certificate file not found: {cert_path}")
+            cert_content = self._read_cert(cert_path)
+            if cert_content is None:
                 return False
 
-            with open(cert_path, 'r') as cert_file:
-                cert_content = cert_file.read().strip()
-
             # 2. Create device profile
             create_profile_url = f"{self.base_url}/deviceProfile"
             profile_data = {
@@ -76,16 +137,15 @@ class ThingsboardDeviceManager:
                     }
                 }
             }
-            print(f"Attempting to create device profile '{profile_name}'...")
-            response = requests.post(
+            _log.debug(f"Attempting to create device profile '{profile_name}'...")
+            response = self._session.post(
                 create_profile_url,
-                headers=self.headers,
                 json=profile_data
             )
             response.raise_for_status()  # Will raise an error for HTTP errors
 
             profile = response.json()
-            print(f"Device profile '{profile_name}' created with ID: {profile['id']['id']}")
+            _log.info(f"Device profile '{profile_name}' created with ID: {profile['id']['id']}")
             return profile
 
         except requests.exceptions.RequestException as e:
@@ -96,12 +156,12 @@ class ThingsboardDeviceManager:
                     error_msg = error_data.get('message', str(e))
                 except json.JSONDecodeError:
                     error_msg = e.response.text
-            print(f"Failed to create device profile: {error_msg}")
+            _log.error(f"Failed to create device profile: {error_msg}")
             return False
 
     def create_device_with_profile(self, device_name: str, profile_name: str = "default") -> str:
         if not self.auth_token:
-            print("Not logged in. Please login first.")
+            _log.error("Not logged in. Please login first.")
             return False
 
         try:
@@ -110,31 +170,30 @@ class ThingsboardDeviceManager:
                 "name": device_name,
                 "type": profile_name
             }
-            print(f"Attempting to create device '{device_name}'...")
-            response = requests.post(
+            _log.debug(f"Attempting to create device '{device_name}'...")
+            response = self._session.post(
                 create_device_url,
-                headers=self.headers,
                 json=device_data
             )
 
             response.raise_for_status() # Will raise an error if device creation itself failed (e.g. duplicate name)
             device_id = response.json()['id']['id']
-            print(f"Device '{device_name}' created/retrieved with ID: {device_id}")
+            _log.info(f"Device '{device_name}' created/retrieved with ID: {device_id}")
 
             return device_id
         except requests.exceptions.RequestException as e:
-            print(f"Failed to create device: {str(e)}")
+            _log.error(f"Failed to create device: {str(e)}")
             return False
         
     def get_device_credentials(self, device_id: str) -> Optional[dict]:
         """Retrieve device credentials by ID, returning only id.id and credentialsValue"""
         if not self.auth_token:
-            print("Not logged in. Please login first.")
+            _log.error("Not logged in. Please login first.")
             return None
 
         try:
             credentials_url = f"{self.base_url}/device/{device_id}/credentials"
-            response = requests.get(credentials_url, headers=self.headers)
+            response = self._session.get(credentials_url)
             response.raise_for_status()
             data = response.json()
             return {
@@ -143,28 +202,20 @@ class ThingsboardDeviceManager:
             }
 
         except requests.exceptions.RequestException as e:
-            print(f"Failed to retrieve device credentials: {str(e)}")
+            _log.error(f"Failed to retrieve device credentials: {str(e)}")
             return None
 
     def post_modify_device_credentials(self, credentials: dict, device_id: str, cert_path: str) -> bool:
         """Modify device credentials by ID to use device certificate"""
         if not self.auth_token:
-            print("Not logged in. Please login first.")
-            return False
-        
-        if not os.path.exists(cert_path):
-            print(f"Certificate file not found: {cert_path}")
+            _log.error("Not logged in. Please login first.")
             return False
         
-        cert_content = None
-        try:
-            with open(cert_path, 'r') as cert_file:
-                cert_content = cert_file.read().strip()
-        except Exception as e:
-            print(f"Failed to read certificate file: {str(e)}")
+        cert_content = self._read_cert(cert_path)
+        if cert_content is None:
             return False
         
-        print(f"Attempting to modify device credentials for device ID {device_id}...")
+        _log.debug(f"Attempting to modify device credentials for device ID {device_id}...")
         request_body = {
             "id": {
                 "id": credentials.get("id")
@@ -180,34 +231,121 @@ class ThingsboardDeviceManager:
 
         try:
             modify_url = f"{self.base_url}/device/credentials"
-            response = requests.post(modify_url, headers=self.headers, json=request_body)
+            response = self._session.post(modify_url, json=request_body)
             response.raise_for_status()
-            print(f"Device credentials for ID {device_id} modified successfully.")
+            _log.info(f"Device credentials for ID {device_id} modified successfully.")
             return True
         except requests.exceptions.RequestException as e:
-            print(f"Failed to modify device credentials: {str(e)}")
+            _log.error(f"Failed to modify device credentials: {str(e)}")
+            return False
+
+    def create_device_with_certificate(self, device_name: str, profile_name: str, cert_path: str) -> Optional[str]:
+        """
+        Creates a device that authenticates with the X.509 certificate at cert_path; returns its ID or None.
+        The device and its credentials are saved in one request (device-with-credentials) instead of
+        create device + get credentials + modify credentials; servers without that endpoint get the three calls.
+        """
+        if not self.auth_token:
+            _log.error("Not logged in. Please login first.")
+            return None
+
+        cert_content = self._read_cert(cert_path)
+        if cert_content is None:
+            return None
+
+        request_body = {
+            "device": {
+                "name": device_name,
+                "type": profile_name
+            },
+            "credentials": {
+                "credentialsType": "X509_CERTIFICATE",
+                "credentialsValue": cert_content
+            }
+        }
+        try:
+            _log.debug(f"Attempting to create device '{device_name}' with X.509 credentials...")
+            response = self._session.post(f"{self.base_url}/device-with-credentials", json=request_body)
+            if response.status_code in (404, 405):
+                _log.debug("Endpoint device-with-credentials not available; creating the device and its credentials separately")
+                return self._create_device_then_credentials(device_name, profile_name, cert_path)
+            response.raise_for_status()
+            device_id = response.json()['id']['id']
+            _log.info(f"Device '{device_name}' created with X.509 credentials, ID: {device_id}")
+            return device_id
+        except requests.exceptions.RequestException as e:
+            _log.error(f"Failed to create device: {str(e)}")
+            return None
+
+    def _create_device_then_credentials(self, device_name: str, profile_name: str, cert_path: str) -> Optional[str]:
+        """Three-call fallback of create_device_with_certificate"""
+        device_id = self.create_device_with_profile(device_name=device_name, profile_name=profile_name)
+        if not device_id:
+            return None
+        device_credentials = self.get_device_credentials(device_id=device_id)
+        if not device_credentials:
+            return None
+        if not self.post_modify_device_credentials(credentials=device_credentials, device_id=device_id, cert_path=cert_path):
+            return None
+        return device_id
+
+    def provision_device(self, device_name: str, ca_cert_path: str, device_cert_path: str) -> Optional[str]:
+        """
+        Creates a profile for the CA certificate and a device using it that authenticates with
+        device_cert_path. Returns the device ID, or None if any step failed.
+        """
+        profile_name = f"Profile_{device_name}"
+        if not self.create_profile_with_certificate(profile_name, ca_cert_path):
+            return None
+        return self.create_device_with_certificate(device_name, profile_name, device_cert_path)
+
+    def provision_devices(self, devices: list, max_workers: int = POOL_SIZE) -> dict:
+        """
+        Provisions several devices concurrently over the shared session (each device's steps stay in order).
+        devices is a list of (device_name, ca_cert_path, device_cert_path); every device needs its own
+        certificate, as ThingsBoard rejects X.509 credentials already used by another device.
+        Returns a dict of device_name -> device ID (None where provisioning failed).
+        """
+        if not devices or not self.ensure_login():
+            return {device_name: None for device_name, _, _ in devices}
+        with ThreadPoolExecutor(max_workers=min(len(devices), max_workers)) as executor:
+            futures = {
+                device_name: executor.submit(self.provision_device, device_name, ca_cert_path, device_cert_path)
+                for device_name, ca_cert_path, device_cert_path in devices
+            }
+        return {device_name: future.result() for device_name, future in futures.items()}
+
+    def tcp_ping(self, timeout: float = 1) -> bool:
+        """Cheap liveness probe: True if the ThingsBoard port accepts a TCP connection (no HTTP, no login)"""
+        try:
+            with socket.create_connection((self.host, self.port), timeout=timeout):
+                return True
+        except OSError:
             return False
 
     def check_connection(self) -> bool:
-        """Check if we can connect to ThingsBoard and login"""
-        print("\nChecking ThingsBoard connection...")
+        """Check if we can connect to ThingsBoard and login (an existing valid token is reused)"""
+        _log.debug("Checking ThingsBoard connection...")
         
         try:
-            if self.login():
+            if self.ensure_login():
                 user_url = f"{self.base_url}/auth/user"
-                response = requests.get(user_url, headers=self.headers)
+                response = self._session.get(user_url)
+                if response.status_code == 401:
+                    # Token revoked server-side; log in again on the next check
+                    self.auth_token = None
                 response.raise_for_status()
                 
                 user_info = response.json()
-                print("\nConnection successful!")
-                print(f"Connected as: {user_info.get('firstName', 'Unknown')} {user_info.get('lastName', '')}")
-                print(f"Authority: {user_info.get('authority', 'Unknown')}")
+                _log.info("Connection successful!")
+                _log.info(f"Connected as: {user_info.get('firstName', 'Unknown')} {user_info.get('lastName', '')}")
+                _log.info(f"Authority: {user_info.get('authority', 'Unknown')}")
                 return True
                 
         except requests.exceptions.ConnectionError:
-            print("Failed to connect to ThingsBoard server")
-            print(f"Make sure ThingsBoard is running at {self.base_url}")
+            _log.warning("Failed to connect to ThingsBoard server")
+            _log.warning(f"Make sure ThingsBoard is running at {self.base_url}")
         except requests.exceptions.RequestException as e:
-            print(f"Error checking connection: {str(e)}")
+            _log.warning(f"Error checking connection: {str(e)}")
         
         return False
\ No newline at end of file
@@ -1,85 +1,129 @@
+import functools
 import getpass
 
-def get_user_choice(prompt, options, allow_manual_entry=False, is_password=False, default_password=None):
+def get_user_choice(prompt, options, allow_manual_entry=False):
     """
-    Prompts the user to choose from a list of options or enter text/password.
-    Added default_password parameter for JKS generation.
+    Prompts the user to choose from a list of options or enter text.
+    Passwords are read with get_password_with_confirmation instead.
     """
-    if not is_password:
-        print(prompt)
-    
-    # If a default password is provided and this is a password prompt, use it
-    if is_password and default_password is not None:
-        return default_password
-    
+    print(prompt)
+
+    # (display text, returned value) per option; dict options are shown with their description
+    choices = [
+        (f"{option['name']} ({option.get('description', 'N/A')})", option['name'])
+        if isinstance(option, dict) and 'name' in option else (option, option)
+        for option in options or ()
+    ]
+    for i, (display, _) in enumerate(choices):
+        print(f"  {i+1}. {display}")
+
+    # The prompt does not change between retries
+    choice_prompt = "Enter your choice"
     if options:
-        for i, option_display in enumerate(options):
-            if isinstance(option_display, dict) and 'name' in option_display:
-                print(f"  {i+1}. {option_display['name']} ({option_display.get('description', 'N/A')})")
-            else:
-                print(f"  {i+1}. {option_display}")
-    
+        choice_prompt += f" (1-{len(options)})"
+    if allow_manual_entry:
+        choice_prompt += f"{' or type custom value' if options else 'Enter value'}"
+    choice_prompt += ": "
+
+    # Typed option numbers map straight to their values, without int() parsing
+    choice_map = {str(i+1): value for i, (_, value) in enumerate(choices)}
+
     while True:
-        try:
-            if is_password:
-                choice = getpass.getpass(prompt)
-            else:
-                choice_prompt = f"Enter your choice"
-                if options:
-                    choice_prompt += f" (1-{len(options)})"
-                if allow_manual_entry:
-                    choice_prompt += f"{' or type custom value' if options else 'Enter value'}"
-                choice_prompt += ": "
-                choice = input(choice_prompt)
-
-            if not options and allow_manual_entry: # Direct text/password input
-                return choice.strip()
-
-            if allow_manual_entry and not choice.isdigit() and options : # Allow direct string input if options are also present
-                return choice.strip()
-
-            choice_num = int(choice)
-            if 1 <= choice_num <= len(options):
-                if isinstance(options[choice_num-1], dict) and 'name' in options[choice_num-1]:
-                    return options[choice_num-1]['name']
-                return options[choice_num-1]
-            else:
-                print(f"Invalid choice. Please enter a number between 1 and {len(options)}.")
-        except ValueError:
-            if allow_manual_entry and not options: # if it's a free text field, any non-empty input is fine
-                 return choice.strip() if choice.strip() else None # return None if empty
-            elif allow_manual_entry and options: # if options are present but user typed text
-                 return choice.strip()
+        choice = input(choice_prompt).strip()
+
+        if allow_manual_entry and (not options or not choice.isdigit()): # Direct text input, or text typed instead of a number
+            return choice
 
+        if choice in choice_map:
+            return choice_map[choice]
+        if choice.isdigit():
+            print(f"Invalid choice. Please enter a number between 1 and {len(options)}.")
+        else:
             print("Invalid input. Please enter a number or valid text.")
-        except IndexError:
-            print("Something went wrong with the choice indexing.")
 
 
+# Terminals in canonical mode cap a line at 1024 bytes (MAX_CANON); getpass can hang on longer pasted input on macOS
+MAX_PASSWORD_LENGTH = 1023
+
+def _read_password(prompt):
+    """Reads a password without echoing it"""
+    return getpass.getpass(prompt).strip()
+
 def get_password_with_confirmation(prompt):
     """Get and confirm password input"""
     while True:
-        password = get_user_choice(prompt, [], allow_manual_entry=True, is_password=True)
-        confirm = get_user_choice("Confirm " + prompt, [], allow_manual_entry=True, is_password=True)
+        password = _read_password(prompt)
+        if len(password) >= MAX_PASSWORD_LENGTH:
+            print(f"Password too long (at most {MAX_PASSWORD_LENGTH - 1} characters). Please try again.")
+            continue
+        confirm = _read_password("Confirm " + prompt)
         if password == confirm and password:
             return password
         print("Passwords do not match or empty. Please try again.")
 
+def get_store_passwords(reuse_single=True, default_password=None):
+    """
+    Collects the (PKCS12, keystore, truststore) passwords.
+    With reuse_single one confirmed password is used for all three stores;
+    a default_password skips prompting entirely.
+    """
+    if default_password is not None:
+        return default_password, default_password, default_password
+    if reuse_single:
+        password = get_password_with_confirmation("Store password: ")
+        return password, password, password
+    return tuple(get_password_with_confirmation(f"{label} password: ") for label in ["PKCS12", "Keystore", "Truststore"])
+
 def fuzzy_search(search_term, text):
-    """Simple fuzzy search implementation"""
-    search_term = search_term.lower()
-    text = text.lower()
-    
+    """Simple fuzzy search implementation."""
+    return _fuzzy_match(search_term.lower(), text.lower())
+
+@functools.lru_cache(maxsize=4096)
+def _fuzzy_match(search_term, text):
+    """
+    fuzzy_search on already lowercased strings.
+    Memoized: the curve filter re-checks every candidate on each keystroke, and the result only depends on the two strings.
+    """
+    # A subsequence can never be longer than the text
+    if len(search_term) > len(text):
+        return False
+
     # Direct match
     if search_term in text:
         return True
-        
-    # Character sequence matching
+
+    # Character sequence matching; str.find scans for each character in C
     j = 0
     for char in search_term:
-        while j < len(text) and text[j] != char:
-            j += 1
-        if j >= len(text):
+        j = text.find(char, j)
+        if j == -1:
             return False
         j += 1
-    return True
\ No newline at end of file
+    return True
+
+# Lets callers drop the memoized matches, as with any lru_cache'd function
+fuzzy_search.cache_clear = _fuzzy_match.cache_clear
+
+class FuzzySearcher:
+    """
+    Filters a fixed candidate list with fuzzy_search as a query is typed. When the query extends the
+    previous one, only the previous matches are checked again: a candidate that does not match a query
+    cannot match any extension of it. key returns the strings a candidate is matched on (default: itself).
+    """
+    def __init__(self, candidates, key=None):
+        key = key or (lambda candidate: (candidate,))
+        # The matched strings are lowercased once here rather than on every keystroke
+        self.entries = [(candidate, tuple(text.lower() for text in key(candidate))) for candidate in candidates]
+        self.last_query = None
+        self.last_entries = self.entries
+
+    def search(self, query):
+        """Returns the candidates matching query, in their original order"""
+        query = query.lower()
+        if self.last_query is not None and query.startswith(self.last_query):
+            pool = self.last_entries
+        else:
+            pool = self.entries
+        self.last_entries = [entry for entry in pool if any(_fuzzy_match(query, text) for text in entry[1])]
+        self.last_query = query
+        return [candidate for candidate, _ in self.last_entries]